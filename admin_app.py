@@ -25,24 +25,73 @@ import threading
 import random
 import subprocess
 import re
+import sys
+import socket
+import argparse
+import mimetypes
+import secrets
+import shutil
+import queue
+import struct
+import termios
+import signal
+import collections
+import atexit
+import itertools
+import heapq
+import tempfile
+import hashlib
+import email.utils
+import gzip
+import fcntl
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed
 from pathlib import Path
-from typing import List, Dict, Any
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Mapping, Iterator
 import feedparser
+import waitress
 import requests
-from flask import Flask, request, render_template, redirect, url_for, jsonify, send_from_directory
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, Response, request, render_template, redirect, url_for, jsonify, send_file, send_from_directory, abort
+from werkzeug.utils import safe_join, secure_filename
+
+try:
+    import brotli  # optional: enables pre-compressed br responses for /api/news
+except ImportError:
+    brotli = None
+
+try:
+    import vlc  # python-vlc: resident libvlc player for low-latency card taps
+except (ImportError, OSError):  # OSError: bindings present but libvlc missing
+    vlc = None
 
 # === Config & Paths ===
 BASE_DIR = Path(__file__).resolve().parent
 VIDEO_DIR = BASE_DIR / "videos"
+RENDITION_DIR = BASE_DIR / "renditions"
+UPLOAD_DIR = BASE_DIR / ".uploads"
+BLOB_DIR = BASE_DIR / "blobs"
+ALIAS_FILE = BASE_DIR / "video_aliases.json"
+VIDEO_INDEX_FILE = BASE_DIR / "video_index.json"
+POSTER_DIR = BASE_DIR / "posters"
 MAP_FILE = BASE_DIR / "video_map.json"
 NEWS_CACHE = BASE_DIR / "news_cache.json"
 STATE_FILE = BASE_DIR / "news_state.json"
 NEWS_LOG = BASE_DIR / "news.log"
+FEED_STATE_FILE = BASE_DIR / "feed_state.json"
+NEWS_STORE_FILE = BASE_DIR / "news_store.json"
 
 VIDEO_DIR.mkdir(parents=True, exist_ok=True)
 
 app = Flask(__name__, template_folder=str(BASE_DIR / "templates"))
 
+# "main" runs everything; "worker" is a read-only HTTP process spawned by
+# `--workers N` (see Run server) that forwards everything else to the main one.
+ADMIN_ROLE = os.environ.get("ADMIN_ROLE", "main")
+ADMIN_CONTROL_URL = os.environ.get("ADMIN_CONTROL_URL", "").rstrip("/")
+
 # RSS feeds (primary)
 DEFAULT_FEEDS = [
     "https://openai.com/blog/rss",
@@ -69,7 +118,7 @@ INDIA_FEEDS = [
 ALLOWED_KEYWORDS = ["AI", "Machine", "ML", "GPT", "Llama", "Claude",
                     "Python", "JavaScript", "Rust", "Go", "TypeScript", "Framework",
                     "Release", "Launch", "Tool", "Open Source", "API", "SDK",
-                    "Cloud", "Data", "Security", "Technology", "Industry", "innovation", "model"
+                    "Cloud", "Data", "Security", "Technology", "Industry", "innovation", "model",
                     "Deep Learning", "Neural Network", "Transformers", "ChatGPT", "Autonomous"]
 
 HTTP_TIMEOUT = 10.0
@@ -97,6 +146,198 @@ def log_news_error(msg: str):
     except Exception:
         pass
 
+# === Durable writes ===
+# All state files go through here: write a temp file next to the target, fsync
+# it, then rename over the target, so readers only ever see a complete file and
+# a power cut leaves either the old or the new version. Callers hand the text
+# to durable_writer and return immediately; one background thread coalesces
+# repeated writes to the same path and does the fsyncs. A write that fails
+# (e.g. ENOSPC on the SD card) stays queued and is retried with backoff, up to
+# DURABLE_RETRY_MAX seconds apart; readers keep getting the queued text.
+DURABLE_WRITE_DELAY = float(os.environ.get("DURABLE_WRITE_DELAY", "0.5"))
+DURABLE_RETRY_MAX = float(os.environ.get("DURABLE_RETRY_MAX", "60"))
+
+def atomic_write_text(path: Path, text: str):
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    try:
+        dir_fd = os.open(str(path.parent), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass  # not supported on every platform/filesystem
+
+class DurableWriter:
+    def __init__(self, delay: float = DURABLE_WRITE_DELAY):
+        self.delay = delay
+        self._pending: Dict[Path, str] = {}
+        self._failures: Dict[Path, int] = {}
+        self._retry_at: Dict[Path, float] = {}
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._thread = None
+
+    def write(self, path: Path, text: str):
+        with self._cond:
+            self._pending[path] = text
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="durable-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self, path: Path) -> Optional[str]:
+        # Text queued for `path` but not yet on disk; readers should prefer it.
+        with self._cond:
+            return self._pending.get(path)
+
+    def read_text(self, path: Path) -> Optional[str]:
+        text = self.pending(path)
+        if text is None and path.exists():
+            text = path.read_text(encoding="utf-8")
+        return text
+
+    def flush(self, due_only: bool = False):
+        now = time.time()
+        with self._cond:
+            batch = {path: text for path, text in self._pending.items()
+                     if not due_only or self._retry_at.get(path, 0) <= now}
+        written = []
+        with self._io_lock:
+            for path, text in batch.items():
+                try:
+                    atomic_write_text(path, text)
+                    written.append(path)
+                except Exception as e:
+                    with self._cond:
+                        n = self._failures[path] = self._failures.get(path, 0) + 1
+                        backoff = min(DURABLE_RETRY_MAX, self.delay * 2 ** n)
+                        self._retry_at[path] = time.time() + backoff
+                    log_news_error(f"Write error {path.name}: {e} (retry in {backoff:.1f}s)")
+        with self._cond:
+            for path in written:
+                self._failures.pop(path, None)
+                self._retry_at.pop(path, None)
+                # keep anything that was re-queued while we were writing
+                if self._pending.get(path) is batch[path]:
+                    del self._pending[path]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    due = min((self._retry_at.get(p, 0) for p in self._pending), default=None)
+                    if due is not None and due <= time.time():
+                        break
+                    self._cond.wait(None if due is None else due - time.time())
+            time.sleep(self.delay)  # let bursts of writes coalesce
+            self.flush(due_only=True)
+
+durable_writer = DurableWriter()
+atexit.register(durable_writer.flush)
+
+# === Background services ===
+# Long-running loops register here instead of starting threads at import
+# time; they only run once an entry point calls `services.start()`: the
+# __main__ block, or create_wsgi_app() for external WSGI runners. Importing the
+# module (tests, test_client(), scripts) starts nothing. Jobs that
+# must run once per host take a LeaderLock; the other processes stand by and
+# take over if the leader exits.
+LEADER_RETRY_SEC = float(os.environ.get("LEADER_RETRY_SEC", "15"))
+SERVICE_STOP_TIMEOUT = float(os.environ.get("SERVICE_STOP_TIMEOUT", "5"))
+
+class LeaderLock:
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self) -> bool:
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+class ServiceScheduler:
+    def __init__(self):
+        self._jobs: List[tuple] = []
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.started = False
+
+    def add(self, name: str, target, lock: Optional[LeaderLock] = None):
+        # target(stop_event) should return soon after stop_event is set
+        self._jobs.append((name, target, lock))
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return
+            self.started = True
+            for name, target, lock in self._jobs:
+                t = threading.Thread(target=self._run, args=(name, target, lock), name=name, daemon=True)
+                t.start()
+                self._threads.append(t)
+        atexit.register(self.stop)  # registered late, so it runs before the store/writer flushes
+
+    def _run(self, name: str, target, lock: Optional[LeaderLock]):
+        while not self._stop.is_set():
+            if lock is not None and not lock.acquire():
+                self._stop.wait(LEADER_RETRY_SEC)  # another process leads; retry in case it goes away
+                continue
+            try:
+                target(self._stop)
+            except Exception as e:
+                log_news_error(f"Service {name} crashed: {e}")
+                self._stop.wait(LEADER_RETRY_SEC)
+            finally:
+                if lock is not None:
+                    lock.release()
+
+    def stop(self, timeout: float = SERVICE_STOP_TIMEOUT):
+        self._stop.set()
+        deadline = time.time() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.time()))
+        stuck = [t.name for t in self._threads if t.is_alive()]
+        if stuck:
+            log_news_error(f"Services still running at shutdown: {', '.join(stuck)}")
+
+    def status(self) -> List[Dict[str, Any]]:
+        alive = {t.name for t in self._threads if t.is_alive()}
+        return [{"name": name, "running": name in alive, "leader": lock.held if lock else None}
+                for name, _, lock in self._jobs]
+
+services = ServiceScheduler()
+
 # === Utilities ===
 def shorten_description(text: str, max_words: int = 45) -> str:
     if not text:
@@ -109,481 +350,2494 @@ def shorten_description(text: str, max_words: int = 45) -> str:
         return " ".join(words[:max_words]).rstrip('.,;:') + "..."
     return text
 
-def normalize_article(title: str, description: str, link: str, source: str, published: str) -> Dict[str, Any]:
+def normalize_article(title: str, description: str, link: str, source: str, published: str) -> "Article":
     title = (title or "").strip()
     description = shorten_description(description or title, 45)
     link = link or ""
     source = source or ""
     published = published or ""
-    return {"title": title, "description": description, "link": link, "source": source, "published": published}
+    return Article(title, description, link, source, published, KEYWORD_MATCHER.matches(title))
 
-def dedupe_and_filter(items: List[Dict[str, Any]], max_items: int = 80) -> List[Dict[str, Any]]:
-    out = []
-    seen_titles = set()
-    seen_links = set()
-    random.shuffle(items)  # mix sources
-    for it in items:
-        t = (it.get("title") or "").strip()
-        l = (it.get("link") or "").strip()
-        if not t:
-            continue
-        # keyword filter
-        if not any(k.lower() in t.lower() for k in ALLOWED_KEYWORDS):
-            # keep some non-matching but recent tech-ish? currently skip
-            continue
-        if t in seen_titles or (l and l in seen_links):
-            continue
-        seen_titles.add(t)
-        if l:
-            seen_links.add(l)
-        out.append(it)
-        if len(out) >= max_items:
-            break
-    return out
+class KeywordMatcher:
+    """All keywords compiled into one alternation regex, so a title is
+    scanned once however long the list gets. Keywords match whole words.
+    Longer ones are case-insensitive and may take an -s/-d ending ("Tools",
+    "Released"); short ones such as "AI" or "Go" are case-sensitive and only
+    take a plural "s" ("APIs"), so they don't fire on "said", "Goes" or "God"."""
+
+    CASE_SENSITIVE_MAX_LEN = 3
+
+    def __init__(self, keywords: List[str]):
+        self._canonical = {k.lower(): k for k in keywords}
+        def alt(words):
+            words = sorted(words, key=len, reverse=True)  # longest first within the alternation
+            return "|".join(re.escape(w).replace(r"\ ", r"[\s-]+") for w in words)
+        short = [k for k in keywords if len(k) <= self.CASE_SENSITIVE_MAX_LEN]
+        long = [k for k in keywords if len(k) > self.CASE_SENSITIVE_MAX_LEN]
+        parts = ([rf"(?i:({alt(long)}))(?:e?[sd])?"] if long else []) + ([rf"({alt(short)})s?"] if short else [])
+        self.pattern = re.compile(rf"(?<!\w)(?:{'|'.join(parts)})(?!\w)")
+
+    def search(self, text: str) -> bool:
+        return self.pattern.search(text) is not None
+
+    def matches(self, text: str) -> List[str]:
+        found = []
+        for m in self.pattern.finditer(text):
+            word = next(g for g in m.groups() if g)
+            k = self._canonical.get(re.sub(r"[\s-]+", " ", word).lower())
+            if k and k not in found:
+                found.append(k)
+        return found
+
+KEYWORD_MATCHER = KeywordMatcher(ALLOWED_KEYWORDS)
+
+class Article:
+    """One normalized headline. Fixed slots instead of a per-item dict, the
+    source name interned (a few dozen distinct values across the whole store),
+    and the JSON form built once: the store file, news_cache.json and the
+    /api/news body all splice in the same cached fragment."""
+
+    __slots__ = ("title", "description", "link", "source", "published", "keywords", "_json")
+    FIELDS = ("title", "description", "link", "source", "published", "keywords")
+
+    def __init__(self, title: str, description: str, link: str, source: str, published: str, keywords=()):
+        self.title = title
+        self.description = description
+        self.link = link
+        self.source = sys.intern(source)
+        self.published = published
+        self.keywords = tuple(keywords)
+        self._json = None
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Article":
+        title = d.get("title") or ""
+        # older files predate keyword tagging
+        keywords = d["keywords"] if "keywords" in d else KEYWORD_MATCHER.matches(title)
+        return cls(title, d.get("description") or "", d.get("link") or "", d.get("source") or "", d.get("published") or "", keywords)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"title": self.title, "description": self.description, "link": self.link, "source": self.source,
+                "published": self.published, "keywords": list(self.keywords)}
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+        return self._json
+
+    def __eq__(self, other):
+        if not isinstance(other, Article):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.FIELDS)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Article({self.title!r}, source={self.source!r})"
+
+# === Shared HTTP session ===
+# One keep-alive pool per host for every fetcher; transient failures are retried
+# with exponential backoff + jitter before the fetcher sees an error.
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", str(HTTP_TIMEOUT)))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.5"))
+HTTP_BACKOFF_JITTER = float(os.environ.get("HTTP_BACKOFF_JITTER", "0.5"))
+HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "24"))
+HTTP_POOL_PER_HOST = int(os.environ.get("HTTP_POOL_PER_HOST", "6"))
+
+def build_retry() -> Retry:
+    opts = dict(total=HTTP_RETRIES, connect=HTTP_RETRIES, read=HTTP_RETRIES, status=HTTP_RETRIES,
+                backoff_factor=HTTP_BACKOFF, status_forcelist=(500, 502, 503, 504),
+                allowed_methods=frozenset(["GET", "HEAD"]), raise_on_status=False,
+                # never sleep for a server-chosen Retry-After inside a fetch
+                # thread; a 429 goes back to the provider's circuit breaker
+                respect_retry_after_header=False)
+    try:
+        return Retry(backoff_jitter=HTTP_BACKOFF_JITTER, **opts)
+    except TypeError:
+        # urllib3 < 2 has no jitter support
+        return Retry(**opts)
+
+def build_http_session() -> requests.Session:
+    session = requests.Session()
+    session.headers["User-Agent"] = f"feedparser/{feedparser.__version__} +https://github.com/kurtmckee/feedparser/"
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_PER_HOST, max_retries=build_retry())
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+http_session = build_http_session()
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    return http_session.get(url, **kwargs)
 
 # === Fetchers ===
 
-def fetch_from_rss(feeds=DEFAULT_FEEDS + INDIA_FEEDS, limit_per_feed: int = 6) -> List[Dict[str, Any]]:
+# Per-feed validators (ETag / Last-Modified) plus the last parsed entries, so an
+# unchanged feed costs one 304 round-trip and no parsing, even after a restart.
+RSS_FETCH_WORKERS = int(os.environ.get("RSS_FETCH_WORKERS", "6"))
+
+def load_feed_state() -> Dict[str, Dict[str, Any]]:
+    try:
+        state = json.loads(FEED_STATE_FILE.read_text(encoding="utf-8")) if FEED_STATE_FILE.exists() else {}
+        for feed in state.values():
+            if "items" in feed:
+                feed["items"] = [Article.from_dict(d) for d in feed["items"]]
+        return state
+    except Exception as e:
+        log_news_error(f"Feed state read error: {e}")
+        return {}
+
+def save_feed_state(state: Dict[str, Dict[str, Any]]):
+    durable_writer.write(FEED_STATE_FILE, json.dumps(state, ensure_ascii=False, default=Article.to_dict))
+
+_feed_state = load_feed_state()
+_feed_state_lock = threading.Lock()
+
+def fetch_feed(url: str, limit_per_feed: int = 6) -> List[Article]:
+    with _feed_state_lock:
+        cached = _feed_state.get(url) or {}
+    headers = {}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("modified"):
+        headers["If-Modified-Since"] = cached["modified"]
+    r = http_get(url, headers=headers)
+    if r.status_code == 304 and "items" in cached:
+        return cached["items"]
+    r.raise_for_status()
+    d = feedparser.parse(r.content, response_headers=r.headers)
+    source = (d.feed.get("title") or url).strip()
     items = []
-    for url in feeds:
+    for e in d.entries[:limit_per_feed]:
+        title = e.get("title", "").strip()
+        desc = e.get("description", "") or e.get("summary", "") or ""
+        link = e.get("link", "") or ""
+        published = e.get("published", "") or e.get("updated", "") or ""
+        items.append(normalize_article(f"[RSS {source}] {title}", desc, link, source, published))
+    with _feed_state_lock:
+        _feed_state[url] = {"etag": r.headers.get("ETag", ""), "modified": r.headers.get("Last-Modified", ""), "items": items}
+    return items
+
+def fetch_from_rss(feeds=DEFAULT_FEEDS + INDIA_FEEDS, limit_per_feed: int = 6) -> Iterator[Article]:
+    # Feeds are yielded in completion order; closing the generator early
+    # cancels the feeds that haven't been requested yet.
+    def one(url):
         try:
-            d = feedparser.parse(url)
-            source = (d.feed.get("title") or url).strip()
-            for e in d.entries[:limit_per_feed]:
-                title = e.get("title", "").strip()
-                desc = e.get("description", "") or e.get("summary", "") or ""
-                link = e.get("link", "") or ""
-                published = e.get("published", "") or e.get("updated", "") or ""
-                items.append(normalize_article(f"[RSS {source}] {title}", desc, link, source, published))
+            return fetch_feed(url, limit_per_feed)
         except Exception as ex:
             log_news_error(f"RSS fetch error {url}: {ex}")
-    return dedupe_and_filter(items, max_items=80)
+            return None
 
-def fetch_from_newsapi(api_key: str, page_size: int = 20) -> List[Dict[str, Any]]:
+    failed = 0
+    pool = ThreadPoolExecutor(max_workers=RSS_FETCH_WORKERS, thread_name_prefix="rss-fetch")
+    try:
+        for fut in as_completed([pool.submit(one, url) for url in feeds]):
+            feed_items = fut.result()
+            if feed_items is None:
+                failed += 1
+            else:
+                yield from feed_items
+        if feeds and failed == len(feeds):
+            raise RuntimeError(f"all {failed} feeds failed")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        with _feed_state_lock:
+            snapshot = dict(_feed_state)
+        save_feed_state(snapshot)
+
+# Fetchers are generators of normalized articles: nothing is requested until
+# run_provider starts pulling, and it closes them once it has enough.
+# API fetchers raise on failure; run_provider logs it and feeds the provider's circuit breaker.
+def fetch_from_newsapi(api_key: str, page_size: int = 20) -> Iterator[Article]:
     if not api_key:
-        return []
+        return
     url = "https://newsapi.org/v2/top-headlines"
     params = {"category": "technology", "pageSize": page_size, "language": "en", "apiKey": api_key}
-    try:
-        r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        articles = r.json().get("articles", [])
-        out = []
-        for a in articles:
-            t = a.get("title", "").strip()
-            desc = a.get("description", "") or a.get("content", "")
-            out.append(normalize_article(f"[NewsAPI] {t}", desc, a.get("url", ""), a.get("source", {}).get("name", "NewsAPI"), a.get("publishedAt", "")))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"NewsAPI fetch error: {e}")
-        return []
+    r = http_get(url, params=params)
+    r.raise_for_status()
+    articles = r.json().get("articles", [])
+    for a in articles:
+        t = a.get("title", "").strip()
+        desc = a.get("description", "") or a.get("content", "")
+        yield normalize_article(f"[NewsAPI] {t}", desc, a.get("url", ""), a.get("source", {}).get("name", "NewsAPI"), a.get("publishedAt", ""))
 
-def fetch_from_gnews(api_key: str, max_items: int = 20) -> List[Dict[str, Any]]:
+def fetch_from_gnews(api_key: str, max_items: int = 20) -> Iterator[Article]:
     if not api_key:
-        return []
+        return
     url = "https://gnews.io/api/v4/top-headlines"
     params = {"topic": "technology", "lang": "en", "max": max_items, "token": api_key}
-    try:
-        r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        articles = r.json().get("articles", [])
-        out = []
-        for a in articles:
-            t = a.get("title", "").strip()
-            desc = a.get("description", "") or a.get("content", "")
-            out.append(normalize_article(f"[GNews] {t}", desc, a.get("url", ""), a.get("source", {}).get("name", "GNews"), a.get("publishedAt", "")))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"GNews fetch error: {e}")
-        return []
+    r = http_get(url, params=params)
+    r.raise_for_status()
+    articles = r.json().get("articles", [])
+    for a in articles:
+        t = a.get("title", "").strip()
+        desc = a.get("description", "") or a.get("content", "")
+        yield normalize_article(f"[GNews] {t}", desc, a.get("url", ""), a.get("source", {}).get("name", "GNews"), a.get("publishedAt", ""))
 
-def fetch_from_mediastack(api_key: str, page_size: int = 20) -> List[Dict[str, Any]]:
+def fetch_from_mediastack(api_key: str, page_size: int = 20) -> Iterator[Article]:
     if not api_key:
-        return []
+        return
     url = "http://api.mediastack.com/v1/news"
     params = {"access_key": api_key, "languages": "en", "countries": "us,in", "categories": "technology", "limit": page_size}
-    try:
-        r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        data = r.json()
-        news_list = data.get("data", [])
-        out = []
-        for a in news_list:
-            out.append(normalize_article(f"[Mediastack] {a.get('title','')}", a.get('description',''), a.get('url',''), a.get('source','Mediastack'), a.get('published_at','')))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"Mediastack fetch error: {e}")
-        return []
+    r = http_get(url, params=params)
+    r.raise_for_status()
+    data = r.json()
+    news_list = data.get("data", [])
+    for a in news_list:
+        yield normalize_article(f"[Mediastack] {a.get('title','')}", a.get('description',''), a.get('url',''), a.get('source','Mediastack'), a.get('published_at',''))
 
-def fetch_from_newsdata(api_key: str, max_items: int = 20) -> List[Dict[str, Any]]:
+def fetch_from_newsdata(api_key: str, max_items: int = 20) -> Iterator[Article]:
     if not api_key:
-        return []
+        return
     url = "https://newsdata.io/api/1/news"
     params = {"apikey": api_key, "language": "en", "category": "technology", "page": 1}
-    try:
-        r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        articles = r.json().get("results", [])
-        out = []
-        for a in articles[:max_items]:
-            out.append(normalize_article(f"[NewsData] {a.get('title','')}", a.get('description','') or a.get('content',''), a.get('link',''), a.get('source_id','NewsData'), a.get('pubDate','')))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"NewsData fetch error: {e}")
-        return []
+    r = http_get(url, params=params)
+    r.raise_for_status()
+    articles = r.json().get("results", [])
+    for a in articles[:max_items]:
+        yield normalize_article(f"[NewsData] {a.get('title','')}", a.get('description','') or a.get('content',''), a.get('link',''), a.get('source_id','NewsData'), a.get('pubDate',''))
 
-def fetch_from_thenewsapi(api_key: str, max_items: int = 20) -> List[Dict[str, Any]]:
+def fetch_from_thenewsapi(api_key: str, max_items: int = 20) -> Iterator[Article]:
     # thenewsapi.com example (formats may vary)
     if not api_key:
-        return []
+        return
     url = "https://api.thenewsapi.com/v1/news/top"
     params = {"api_token": api_key, "locale": "en-US", "limit": max_items}
-    try:
-        r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        articles = r.json().get("data", [])
-        out = []
-        for a in articles[:max_items]:
-            out.append(normalize_article(f"[TheNewsAPI] {a.get('title','')}", a.get('description','') or a.get('snippet',''), a.get('url',''), a.get('source','TheNewsAPI'), a.get('published_at','')))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"TheNewsAPI fetch error: {e}")
-        return []
+    r = http_get(url, params=params)
+    r.raise_for_status()
+    articles = r.json().get("data", [])
+    for a in articles[:max_items]:
+        yield normalize_article(f"[TheNewsAPI] {a.get('title','')}", a.get('description','') or a.get('snippet',''), a.get('url',''), a.get('source','TheNewsAPI'), a.get('published_at',''))
 
-def fetch_from_contextualweb_rapidapi(rapidapi_key: str, rapidapi_host: str, max_items: int = 20) -> List[Dict[str, Any]]:
+def fetch_from_contextualweb_rapidapi(rapidapi_key: str, rapidapi_host: str, max_items: int = 20) -> Iterator[Article]:
     # ContextualWeb via RapidAPI (example)
     if not rapidapi_key or not rapidapi_host:
-        return []
+        return
     url = "https://contextualwebsearch-websearch-v1.p.rapidapi.com/api/search/NewsSearchAPI"
     headers = {"x-rapidapi-key": rapidapi_key, "x-rapidapi-host": rapidapi_host}
     params = {"q": "technology OR AI OR machine learning", "pageNumber": "1", "pageSize": str(max_items), "autoCorrect": "true"}
-    try:
-        r = requests.get(url, headers=headers, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        data = r.json()
-        articles = data.get("value", []) or data.get("articles", []) or []
-        out = []
-        for a in articles[:max_items]:
-            title = a.get("title") or a.get("name") or ""
-            desc = a.get("description") or a.get("snippet") or ""
-            link = a.get("url") or a.get("urlToImage") or ""
-            src = a.get("provider", {}).get("name", "ContextualWeb")
-            out.append(normalize_article(f"[ContextualWeb] {title}", desc, link, src, a.get("datePublished", "")))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"ContextualWeb (RapidAPI) fetch error: {e}")
-        return []
+    r = http_get(url, headers=headers, params=params)
+    r.raise_for_status()
+    data = r.json()
+    articles = data.get("value", []) or data.get("articles", []) or []
+    for a in articles[:max_items]:
+        title = a.get("title") or a.get("name") or ""
+        desc = a.get("description") or a.get("snippet") or ""
+        link = a.get("url") or a.get("urlToImage") or ""
+        src = a.get("provider", {}).get("name", "ContextualWeb")
+        yield normalize_article(f"[ContextualWeb] {title}", desc, link, src, a.get("datePublished", ""))
 
-def fetch_from_webz(webz_key: str, max_items: int = 20) -> List[Dict[str, Any]]:
+def fetch_from_webz(webz_key: str, max_items: int = 20) -> Iterator[Article]:
     # webz.io (requires account and key) - example search endpoint
     if not webz_key:
-        return []
+        return
     url = "https://api.webz.io/v1/news"
     params = {"query": "technology OR AI OR machine learning", "size": max_items, "source": "news", "apikey": webz_key}
-    try:
-        r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        data = r.json()
-        hits = data.get("hits", [])
-        out = []
-        for h in hits[:max_items]:
-            out.append(normalize_article(f"[Webz] {h.get('title','')}", h.get('text',''), h.get('url',''), h.get('source','Webz'), h.get('publishedAt','')))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"Webz fetch error: {e}")
-        return []
+    r = http_get(url, params=params)
+    r.raise_for_status()
+    data = r.json()
+    hits = data.get("hits", [])
+    for h in hits[:max_items]:
+        yield normalize_article(f"[Webz] {h.get('title','')}", h.get('text',''), h.get('url',''), h.get('source','Webz'), h.get('publishedAt',''))
 
-def fetch_from_guardian(api_key: str, max_items: int = 20) -> List[Dict[str, Any]]:
+def fetch_from_guardian(api_key: str, max_items: int = 20) -> Iterator[Article]:
     if not api_key:
-        return []
+        return
     url = "https://content.guardianapis.com/search"
     params = {"api-key": api_key, "section": "technology", "show-fields": "trailText,headline,short-url", "page-size": max_items}
-    try:
-        r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        results = r.json().get("response", {}).get("results", [])
-        out = []
-        for rj in results:
-            title = rj.get("webTitle", "")
-            desc = (rj.get("fields") or {}).get("trailText", "")
-            link = rj.get("webUrl", "")
-            out.append(normalize_article(f"[Guardian] {title}", desc, link, "The Guardian", rj.get("webPublicationDate", "")))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"Guardian fetch error: {e}")
-        return []
+    r = http_get(url, params=params)
+    r.raise_for_status()
+    results = r.json().get("response", {}).get("results", [])
+    for rj in results:
+        title = rj.get("webTitle", "")
+        desc = (rj.get("fields") or {}).get("trailText", "")
+        link = rj.get("webUrl", "")
+        yield normalize_article(f"[Guardian] {title}", desc, link, "The Guardian", rj.get("webPublicationDate", ""))
 
-def fetch_from_nytimes(api_key: str, max_items: int = 20) -> List[Dict[str, Any]]:
+def fetch_from_nytimes(api_key: str, max_items: int = 20) -> Iterator[Article]:
     if not api_key:
-        return []
+        return
     url = "https://api.nytimes.com/svc/topstories/v2/technology.json"
     params = {"api-key": api_key}
-    try:
-        r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        results = r.json().get("results", [])
-        out = []
-        for rj in results[:max_items]:
-            title = rj.get("title", "")
-            desc = rj.get("abstract", "")
-            link = rj.get("url", "")
-            out.append(normalize_article(f"[NYTimes] {title}", desc, link, "NYTimes", rj.get("published_date", "")))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"NYTimes fetch error: {e}")
-        return []
+    r = http_get(url, params=params)
+    r.raise_for_status()
+    results = r.json().get("results", [])
+    for rj in results[:max_items]:
+        title = rj.get("title", "")
+        desc = rj.get("abstract", "")
+        link = rj.get("url", "")
+        yield normalize_article(f"[NYTimes] {title}", desc, link, "NYTimes", rj.get("published_date", ""))
 
-def fetch_from_newscatcher(api_key: str, max_items: int = 20) -> List[Dict[str, Any]]:
+def fetch_from_newscatcher(api_key: str, max_items: int = 20) -> Iterator[Article]:
     if not api_key:
-        return []
+        return
     url = "https://api.newscatcherapi.com/v2/latest_headlines"
     headers = {"x-api-key": api_key}
     params = {"topic": "technology", "lang": "en", "page_size": max_items}
-    try:
-        r = requests.get(url, headers=headers, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        articles = r.json().get("articles", [])
-        out = []
-        for a in articles[:max_items]:
-            out.append(normalize_article(f"[Newscatcher] {a.get('title','')}", a.get('summary','') or a.get('excerpt',''), a.get('link',''), a.get('clean_url','Newscatcher'), a.get('published_date','')))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"Newscatcher fetch error: {e}")
-        return []
+    r = http_get(url, headers=headers, params=params)
+    r.raise_for_status()
+    articles = r.json().get("articles", [])
+    for a in articles[:max_items]:
+        yield normalize_article(f"[Newscatcher] {a.get('title','')}", a.get('summary','') or a.get('excerpt',''), a.get('link',''), a.get('clean_url','Newscatcher'), a.get('published_date',''))
 
-def fetch_from_gdelt(max_items: int = 30) -> List[Dict[str, Any]]:
+def fetch_from_gdelt(max_items: int = 30) -> Iterator[Article]:
     # Basic GDELT pull: GDELT 2.0 has "events" and "mentions" datasets; for news, the "GDELT 2.0 Global Knowledge Graph" or Mentions feed is used.
     # Here we use a simple GDELT JSON query for recent mentions with "technology" keyword (best-effort).
-    try:
-        url = "https://api.gdeltproject.org/api/v2/doc/doc"
-        params = {"query": "technology OR AI OR machine learning", "mode": "artlist", "format": "json"}
-        r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        docs = r.json().get("articles", []) or r.json().get("docs", [])
-        out = []
-        for d in docs[:max_items]:
-            title = d.get("title") or d.get("seendocumenttitle") or ""
-            desc = d.get("description") or d.get("summary") or ""
-            link = d.get("url") or d.get("domain") or ""
-            out.append(normalize_article(f"[GDELT] {title}", desc, link, d.get("source", "GDELT"), d.get("seendate", "")))
-        return dedupe_and_filter(out, max_items=60)
-    except Exception as e:
-        log_news_error(f"GDELT fetch error: {e}")
-        return []
+    url = "https://api.gdeltproject.org/api/v2/doc/doc"
+    params = {"query": "technology OR AI OR machine learning", "mode": "artlist", "format": "json"}
+    r = http_get(url, params=params)
+    r.raise_for_status()
+    docs = r.json().get("articles", []) or r.json().get("docs", [])
+    for d in docs[:max_items]:
+        title = d.get("title") or d.get("seendocumenttitle") or ""
+        desc = d.get("description") or d.get("summary") or ""
+        link = d.get("url") or d.get("domain") or ""
+        yield normalize_article(f"[GDELT] {title}", desc, link, d.get("source", "GDELT"), d.get("seendate", ""))
 
-def fetch_from_commoncrawl_stub(max_items: int = 0) -> List[Dict[str, Any]]:
+def fetch_from_commoncrawl_stub(max_items: int = 0) -> Iterator[Article]:
     # CommonCrawl / News Crawl requires specialized usage (index harvesting, WARC parsing).
     # Provide a stub that returns [] and logs a note so you can implement a custom crawler if needed.
     log_news_error("CommonCrawl/NewsCrawl fetcher called but is not implemented (requires custom index/WARC handling).")
-    return []
+    return iter(())
 
-# === Aggregator ===
-def fetch_and_cache_all() -> Dict[str, Any]:
-    items: List[Dict[str, Any]] = []
+# === Article store ===
+# Incremental store of every article we have seen, keyed by canonical URL (or a
+# content hash when there is no link). Refreshes upsert into it instead of
+# rebuilding the cache, so a provider that is down keeps its last good items
+# until they age out.
+NEWS_MAX_AGE_SEC = float(os.environ.get("NEWS_MAX_AGE_HOURS", "24")) * 3600
+NEWS_STORE_MAX = int(os.environ.get("NEWS_STORE_MAX", "600"))
 
-    # 1) RSS (fast, primary)
-    try:
-        items.extend(fetch_from_rss())
-    except Exception as e:
-        log_news_error(f"Error fetching RSS combined: {e}")
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "cmpid", "ocid", "ref", "ref_src", "guccounter")
 
-    # 2) Priority API fetchers (if keys present) - add them to items list
-    try:
-        items.extend(fetch_from_newsapi(NEWSAPI_KEY))
-    except Exception as e:
-        log_news_error(f"Error fetching NewsAPI: {e}")
+def canonical_url(link: str) -> str:
+    link = (link or "").strip()
+    if not link.startswith(("http://", "https://")):
+        return ""
+    parts = urlsplit(link)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith(TRACKING_PARAMS))
+    return urlunsplit(("https", host, parts.path.rstrip("/") or "/", urlencode(query), ""))
 
-    try:
-        items.extend(fetch_from_gnews(GNEWS_KEY))
-    except Exception as e:
-        log_news_error(f"Error fetching GNews: {e}")
+def article_key(item: Article) -> str:
+    url = canonical_url(item.link)
+    if url:
+        return url
+    basis = f"{item.source}|{item.title.strip().lower()}"
+    return "sha1:" + hashlib.sha1(basis.encode("utf-8")).hexdigest()
 
-    try:
-        items.extend(fetch_from_mediastack(MEDIASTACK_KEY))
-    except Exception as e:
-        log_news_error(f"Error fetching Mediastack: {e}")
+# Near-duplicates: the same story syndicated through several providers has
+# different links and slightly different headlines. Candidates come from a
+# MinHash LSH index over character 4-grams of the cleaned headline (bands of
+# NEAR_DUP_ROWS values, so only headlines sharing a band are compared), and
+# each candidate is then verified:
+#   - names and numbers ("Gemini"/"Gemma", "1.80"/"1.81", "iPhone"/"Mac") must
+#     not conflict: if each headline has one the other lacks, it's another story;
+#   - the action must not flip: "delays"/"releases", "falls"/"rises",
+#     "sued"/"wins" (HEADLINE_OPPOSED) is another story with the same names;
+#   - the 4-gram Jaccard must reach NEAR_DUP_JACCARD, 0.1 higher when one
+#     headline names something extra.
+# Shingle similarity alone can't tell a swapped product name or a reversed
+# verb from a reworded copy, which is why those checks come first.
+NEAR_DUP_JACCARD = float(os.environ.get("NEAR_DUP_JACCARD", "0.55"))
+NEAR_DUP_BANDS = 20
+NEAR_DUP_ROWS = 2
+HEADLINE_PREFIX_RE = re.compile(r"^\s*\[[^\]]*\]\s*")           # "[NewsAPI] ", "[RSS The Verge] "
+HEADLINE_SUFFIX_RE = re.compile(r"\s+[-|\u2013\u2014]\s+[^-|\u2013\u2014]{1,40}$")  # " - The Verge"
+HEADLINE_STOPWORDS = frozenset("a an the and or of to in on for with at by from is are as its it this that".split())
+HEADLINE_AMOUNT_RE = re.compile(r"(\d+(?:\.\d+)*)(?:bn|b|m|k|tn|gb|tb|mb)?")  # "4bn" names the same number as "4 billion"
+HEADLINE_ACTIONS = {name: re.compile(pattern) for name, pattern in {
+    "up": r"ris(e|es|ing)|rose|soar\w*|surg\w*|jump\w*|climb\w*|gain(s|ed)?|rais(e|es|ed|ing)|hik(e|es|ed)|increas\w*|boost\w*",
+    "down": r"fall(s|ing|en)?|fell|drop\w*|plung\w*|slid(e|es|ing)|slump\w*|sink\w*|sank|tumbl\w*|cut(s|ting)?|lower(s|ed)?|slash\w*|reduc\w*",
+    "delay": r"delay\w*|postpon\w*|scrap\w*|cancel\w*",
+    "launch": r"releas\w*|launch\w*|ship(s|ped)?|debut\w*|unveil\w*",
+    "win": r"win(s|ning)?|won|beat(s)?",
+    "lose": r"los(e|es|ing)|lost|sue[sd]?|suing|fined|miss(es|ed)?",
+    "approve": r"approv\w*|clear(s|ed)|allow\w*",
+    "block": r"block\w*|reject\w*|ban(s|ned)?|den(y|ies|ied)|halt\w*",
+    "buy": r"buy(s|ing)?|bought|acquir\w*",
+    "sell": r"sell(s|ing)?|sold|divest\w*",
+}.items()}
+HEADLINE_OPPOSED = [("up", "down"), ("delay", "launch"), ("win", "lose"), ("approve", "block"), ("buy", "sell")]
 
-    try:
-        items.extend(fetch_from_newsdata(NEWSDATA_KEY))
-    except Exception as e:
-        log_news_error(f"Error fetching NewsData: {e}")
+def clean_headline(title: str) -> str:
+    return HEADLINE_SUFFIX_RE.sub("", HEADLINE_PREFIX_RE.sub("", title or ""))
 
-    try:
-        items.extend(fetch_from_thenewsapi(THENEWSAPI_KEY))
-    except Exception as e:
-        log_news_error(f"Error fetching TheNewsAPI: {e}")
+def headline_tokens(title: str) -> List[str]:
+    return [w for w in re.findall(r"\w+", clean_headline(title).lower()) if w not in HEADLINE_STOPWORDS]
 
-    try:
-        items.extend(fetch_from_contextualweb_rapidapi(RAPIDAPI_KEY, RAPIDAPI_HOST))
-    except Exception as e:
-        log_news_error(f"Error fetching ContextualWeb: {e}")
+def headline_shingles(title: str, k: int = 4) -> frozenset:
+    text = f" {' '.join(headline_tokens(title))} "
+    return frozenset(text[i:i + k] for i in range(max(1, len(text) - k + 1)))
 
-    try:
-        items.extend(fetch_from_webz(WEBZ_KEY))
-    except Exception as e:
-        log_news_error(f"Error fetching Webz: {e}")
+HEADLINE_OPENERS = {"a", "an", "the", "how", "why", "what", "when", "where", "who", "which", "this",
+                    "these", "here", "new", "report", "exclusive", "breaking", "watch", "analysis", "opinion"}
 
-    try:
-        items.extend(fetch_from_guardian(GUARDIAN_KEY))
-    except Exception as e:
-        log_news_error(f"Error fetching Guardian: {e}")
+def headline_actions(title: str) -> frozenset:
+    return frozenset(name for w in headline_tokens(title) for name, pattern in HEADLINE_ACTIONS.items()
+                     if pattern.fullmatch(w))
 
-    try:
-        items.extend(fetch_from_nytimes(NYTIMES_KEY))
-    except Exception as e:
-        log_news_error(f"Error fetching NYTimes: {e}")
+def headline_names(title: str) -> frozenset:
+    # Numbers, mixed-case words (iPhone, OpenAI, GPT) and, unless the headline
+    # is in Title Case, capitalized words (the first only if it is not a
+    # common opener like "The" or "How").
+    words = re.findall(r"\w+", clean_headline(title))
+    long_words = [w for w in words[1:] if len(w) > 3 and w.isalpha()]
+    title_case = bool(long_words) and sum(w[0].isupper() for w in long_words) / len(long_words) > 0.9
+    names = set()
+    for i, w in enumerate(words):
+        if any(c.isdigit() for c in w) or any(c.isupper() for c in w[1:]) or (not title_case and w[0].isupper() and (i > 0 or w.lower() not in HEADLINE_OPENERS)):
+            amount = HEADLINE_AMOUNT_RE.fullmatch(w.lower())
+            names.add(amount.group(1) if amount else w.lower())
+    return frozenset(names)
+
+_MINHASH_PRIME = (1 << 61) - 1
+_minhash_rng = random.Random(0x5EED)
+_MINHASH_COEFFS = [(_minhash_rng.randrange(1, _MINHASH_PRIME), _minhash_rng.randrange(_MINHASH_PRIME))
+                   for _ in range(NEAR_DUP_BANDS * NEAR_DUP_ROWS)]
+
+def minhash(shingles: frozenset) -> List[int]:
+    xs = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+    return [min((a * x + b) % _MINHASH_PRIME for x in xs) for a, b in _MINHASH_COEFFS]
+
+class HeadlineSig:
+    __slots__ = ("shingles", "names", "actions", "bands")
+
+    def __init__(self, title: str):
+        self.shingles = headline_shingles(title)
+        self.names = headline_names(title)
+        self.actions = headline_actions(title)
+        mh = minhash(self.shingles)
+        self.bands = [(i, *mh[i * NEAR_DUP_ROWS:(i + 1) * NEAR_DUP_ROWS]) for i in range(NEAR_DUP_BANDS)]
+
+    def similarity(self, other: "HeadlineSig") -> float:
+        # 0.0 means "not the same story"
+        if self.names - other.names and other.names - self.names:
+            return 0.0
+        for a, b in HEADLINE_OPPOSED:
+            # "delays iOS 18 release" vs "releases iOS 18": one side does a, the other only b
+            if (a in self.actions - other.actions and b in other.actions) or \
+               (a in other.actions - self.actions and b in self.actions):
+                return 0.0
+        jaccard = len(self.shingles & other.shingles) / len(self.shingles | other.shingles)
+        threshold = NEAR_DUP_JACCARD if self.names == other.names else NEAR_DUP_JACCARD + 0.1
+        return jaccard if jaccard >= threshold else 0.0
+
+# Labelled headline pairs the settings above were tuned on: (a, b, same story).
+# near_dup_mismatches() lists the ones the current settings get wrong, e.g.
+# after changing NEAR_DUP_JACCARD.
+NEAR_DUP_CASES = [
+    ("[NewsAPI] OpenAI unveils GPT-5 with better reasoning - The Verge",
+     "[GNews] OpenAI unveils GPT-5 with improved reasoning", True),
+    ("[Guardian] Nvidia shows off new AI data centers at GTC 2025",
+     "[RSS TechRadar] Nvidia shows off new AI data centres at GTC", True),
+    ("[NewsAPI] Apple launches new AI features for iPhone - 9to5Mac",
+     "[RSS TechRadar] Apple launches new AI features for the iPhone", True),
+    ("[NewsAPI] Google releases Gemini 2 model to developers",
+     "[NewsData] Google releases Gemini 2 AI model to developers", True),
+    ("[Webz] Microsoft announces Copilot update for Windows 11",
+     "[GDELT] Microsoft announces major Copilot update for Windows 11 users", True),
+    ("[GNews] Meta open-sources Llama 4 model", "[Guardian] Meta open sources its Llama 4 model", True),
+    ("[NYTimes] EU opens antitrust probe into Microsoft's AI deals",
+     "[Guardian] EU opens antitrust probe into Microsoft AI deals - Reuters", True),
+    ("[NewsAPI] Amazon to invest $4bn in Anthropic",
+     "[GNews] Amazon to invest $4 billion in Anthropic", True),
+    ("[RSS ZDNet] Python 3.13 released with experimental JIT",
+     "[RSS The Verge] Python 3.13 is released with an experimental JIT", True),
+    ("[NewsAPI] Tesla recalls 2 million vehicles over Autopilot security flaw",
+     "[GDELT] Tesla recalls two million vehicles over Autopilot flaw", True),
+    ("[Mediastack] Samsung unveils Galaxy AI tools at Unpacked event",
+     "[NewsData] Samsung unveils new Galaxy AI tools at its Unpacked event", True),
+    ("[Guardian] UK regulator launches inquiry into cloud market",
+     "[RSS Digit] UK regulator launches investigation into cloud market", True),
+    ("[RSS] Rust 1.80 released", "[RSS] Rust 1.81 released", False),
+    ("[RSS] Copilot for Security", "[RSS] Copilot for Finance", False),
+    ("[RSS] Python 3.12 released with new features", "[RSS] Python 3.13 released with new features", False),
+    ("[NewsAPI] Nvidia stock surges on AI chip demand",
+     "[GNews] AMD stock falls despite AI chip demand", False),
+    ("[RSS] OpenAI launches new API for developers",
+     "[RSS] Anthropic launches new API for developers", False),
+    ("[RSS] New JavaScript framework released", "[RSS] New TypeScript framework released", False),
+    ("[RSS] Apple launches new AI features for iPhone",
+     "[RSS] Apple launches new AI features for Mac", False),
+    ("[RSS] Google releases Gemini 2 model to developers",
+     "[RSS] Google releases Gemma 2 model to developers", False),
+    ("[RSS] Microsoft announces Copilot update for Windows 11",
+     "[RSS] Microsoft announces Copilot update for Windows 10", False),
+    ("[RSS] Security flaw found in popular open source library",
+     "[RSS] Security flaw found in popular Python library", False),
+    ("[RSS] EU fines Meta over data privacy", "[RSS] EU fines Google over data privacy", False),
+    ("[RSS] Samsung unveils Galaxy S25", "[RSS] Samsung unveils Galaxy Ring", False),
+    ("[RSS] Apple delays iOS 18 release", "[RSS] Apple releases iOS 18", False),
+    ("[RSS] Amazon cuts cloud prices", "[RSS] Amazon raises cloud prices", False),
+    ("[RSS] Nvidia stock falls after earnings report",
+     "[RSS] Nvidia stock rises after earnings report", False),
+    ("[RSS] Meta sued over AI training data", "[RSS] Meta wins lawsuit over AI training data", False),
+]
+
+def near_dup_mismatches() -> List[tuple]:
+    return [(a, b, same) for a, b, same in NEAR_DUP_CASES
+            if (HeadlineSig(a).similarity(HeadlineSig(b)) > 0) != same]
+
+class NearDupIndex:
+    def __init__(self):
+        self._buckets: Dict[tuple, set] = {}
+        self._sigs: Dict[str, HeadlineSig] = {}
+
+    def add(self, key: str, sig: HeadlineSig):
+        self.remove(key)
+        self._sigs[key] = sig
+        for band in sig.bands:
+            self._buckets.setdefault(band, set()).add(key)
+
+    def remove(self, key: str):
+        sig = self._sigs.pop(key, None)
+        for band in (sig.bands if sig else ()):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def keys(self) -> List[str]:
+        return list(self._sigs)
+
+    def find(self, sig: HeadlineSig) -> Optional[str]:
+        candidates = set()
+        for band in sig.bands:
+            candidates |= self._buckets.get(band, set())
+        best, best_sim = None, 0.0
+        for key in sorted(candidates):
+            sim = sig.similarity(self._sigs[key])
+            if sim > best_sim:
+                best, best_sim = key, sim
+        return best
+
+class ArticleStore:
+    def __init__(self, path: Path, max_age: float = NEWS_MAX_AGE_SEC, max_items: int = NEWS_STORE_MAX):
+        self.path = path
+        self.max_age = max_age
+        self.max_items = max_items
+        # key -> {"article": Article, "provider", "first_seen", "last_seen", "copies"?}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._index = NearDupIndex()
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            if self.path.exists():
+                entries = json.loads(self.path.read_text(encoding="utf-8"))
+                for entry in entries.values():
+                    entry["article"] = Article.from_dict(entry["article"])
+                    entry.pop("keywords", None)  # now carried by the article
+                with self._lock:
+                    self._entries = entries
+                    self._reindex()
+        except Exception as e:
+            log_news_error(f"News store read error: {e}")
+
+    def _reindex(self):
+        # Oldest first, so the copy that arrived first stays canonical; also
+        # collapses near-duplicates in stores written before the index existed.
+        self._index = NearDupIndex()
+        for key, entry in sorted(self._entries.items(), key=lambda kv: kv[1]["first_seen"]):
+            entry.pop("simhash", None)  # written by an earlier version
+            sig = HeadlineSig(entry["article"].title)
+            if self._index.find(sig) is not None:
+                del self._entries[key]
+            else:
+                self._index.add(key, sig)
+
+    def save(self):
+        # splice each article's cached JSON instead of re-encoding it
+        with self._lock:
+            parts = []
+            for key, entry in self._entries.items():
+                meta = json.dumps({k: v for k, v in entry.items() if k != "article"}, ensure_ascii=False)
+                parts.append(f'{json.dumps(key, ensure_ascii=False)}:{{"article":{entry["article"].json},{meta[1:]}')
+        durable_writer.write(self.path, "{" + ",".join(parts) + "}")
+
+    def upsert(self, provider: str, items: List[Article], now: float = None) -> int:
+        # returns how many new on-topic stories this added
+        now = now or time.time()
+        added = 0
+        with self._lock:
+            for it in items:
+                key = article_key(it)
+                entry = self._entries.get(key)
+                if entry is None:
+                    sig = HeadlineSig(it.title)
+                    twin = self._index.find(sig)
+                    if twin is not None:
+                        # another provider's copy of a story we already hold
+                        entry = self._entries[twin]
+                        entry["last_seen"] = now
+                        if provider != entry["provider"] and provider not in entry.setdefault("copies", []):
+                            entry["copies"].append(provider)
+                        continue
+                    self._entries[key] = {"article": it, "provider": provider, "first_seen": now, "last_seen": now}
+                    self._index.add(key, sig)
+                    added += bool(it.keywords)
+                else:
+                    if entry["article"] != it:
+                        if entry["article"].title != it.title:
+                            self._index.add(key, HeadlineSig(it.title))
+                        entry["article"] = it
+                    entry["last_seen"] = now
+        return added
+
+    def evict(self, now: float = None) -> int:
+        now = now or time.time()
+        with self._lock:
+            before = len(self._entries)
+            self._entries = {k: e for k, e in self._entries.items() if now - e["last_seen"] <= self.max_age}
+            if len(self._entries) > self.max_items:
+                # off-topic items (no keyword match) go first, then the oldest
+                newest = sorted(self._entries.items(), key=lambda kv: (bool(kv[1]["article"].keywords), kv[1]["first_seen"]), reverse=True)
+                self._entries = dict(newest[:self.max_items])
+            for key in [k for k in self._index.keys() if k not in self._entries]:
+                self._index.remove(key)
+            return before - len(self._entries)
+
+    def articles(self) -> List[Article]:
+        return [e["article"] for e in self.entries()]
+
+    def entries(self) -> List[Dict[str, Any]]:
+        # newest first; shallow copies carrying their store key
+        with self._lock:
+            entries = [dict(e, key=k) for k, e in self._entries.items()]
+        entries.sort(key=lambda e: (-e["first_seen"], e["key"]))
+        return entries
 
+    def count(self, provider: str) -> int:
+        with self._lock:
+            return sum(1 for e in self._entries.values() if e["provider"] == provider)
+
+news_store = ArticleStore(NEWS_STORE_FILE)
+news_store.load()
+
+# === News snapshot ===
+# Routes serve the latest refresh from memory. Each refresh builds a new
+# NewsSnapshot and swaps the module reference in one assignment, so readers
+# never see a half-built list; news_cache.json is only read back at startup.
+# The /api/news body is serialized and compressed once here, not per request.
+class NewsSnapshot:
+    __slots__ = ("generated", "items", "etag", "bodies")
+
+    def __init__(self, generated: int, items: List[Article]):
+        self.generated = int(generated)
+        self.items = tuple(items)  # shared with the store; treat as read-only
+        body = f'{{"generated":{self.generated},"items":[{",".join(a.json for a in self.items)}]}}'.encode("utf-8")
+        self.etag = f"{self.generated}-{hashlib.sha1(body).hexdigest()[:12]}"
+        # content-coding -> pre-encoded body
+        self.bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=11)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"generated": self.generated, "items": [a.to_dict() for a in self.items]}
+
+_news_snapshot: Optional[NewsSnapshot] = None
+
+def publish_news_snapshot(cache: Dict[str, Any]) -> NewsSnapshot:
+    global _news_snapshot
+    items = [it if isinstance(it, Article) else Article.from_dict(it) for it in cache.get("items") or []]
+    snap = NewsSnapshot(cache.get("generated", 0), items)
+    _news_snapshot = snap
+    return snap
+
+def current_news_snapshot() -> Optional[NewsSnapshot]:
+    return _news_snapshot
+
+def pick_content_coding(accept_encoding, available) -> str:
+    for coding in ("br", "gzip"):
+        if coding in available and accept_encoding[coding]:
+            return coding
+    return "identity"
+
+def news_snapshot_response(snap: NewsSnapshot) -> Response:
+    coding = pick_content_coding(request.accept_encodings, snap.bodies)
+    # each coding is its own representation, so its own tag; If-None-Match
+    # compares weakly, as a gzipping proxy hands back W/"..."
+    etag = snap.etag if coding == "identity" else f"{snap.etag}-{coding}"
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(snap.bodies[coding], mimetype="application/json")
+        if coding != "identity":
+            resp.headers["Content-Encoding"] = coding
+    resp.set_etag(etag)
+    resp.vary.add("Accept-Encoding")
+    resp.cache_control.no_cache = True  # always revalidate; the 304 is cheap
+    return resp
+
+def load_news_snapshot():
+    if not NEWS_CACHE.exists():
+        return
     try:
-        items.extend(fetch_from_newscatcher(NEWSCATCHER_KEY))
+        publish_news_snapshot(json.loads(NEWS_CACHE.read_text(encoding="utf-8")))
     except Exception as e:
-        log_news_error(f"Error fetching Newscatcher: {e}")
+        log_news_error(f"News cache read error: {e}")
+
+load_news_snapshot()
 
+# === Provider scheduling ===
+# Each provider has its own polling interval (quota-limited APIs slower, RSS
+# faster) and its own circuit breaker, so a dead endpoint stops costing a full
+# timeout on every cycle. Override an interval with NEWS_INTERVAL_<NAME>.
+NEWS_SCHEDULER_TICK = int(os.environ.get("NEWS_SCHEDULER_TICK", "15"))
+BREAKER_THRESHOLD = int(os.environ.get("NEWS_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.environ.get("NEWS_BREAKER_COOLDOWN", "300"))
+BREAKER_MAX_COOLDOWN = float(os.environ.get("NEWS_BREAKER_MAX_COOLDOWN", str(6 * 3600)))
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures. Once the cooldown
+    has passed one probe is let through (half-open): success closes the breaker,
+    failure re-opens it with the cooldown doubled (capped at max_cooldown)."""
+
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN, max_cooldown: float = BREAKER_MAX_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self, now: float) -> bool:
+        with self._lock:
+            if self.state == "open" and now - self.opened_at >= self.cooldown:
+                self.state = "half-open"
+            return self.state != "open"
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                log_news_error(f"{self.name} circuit closed")
+            self.state = "closed"
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+
+    def record_failure(self, now: float):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open":
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.failures < self.threshold:
+                return
+            self.state = "open"
+            self.opened_at = now
+            log_news_error(f"{self.name} circuit open for {self.cooldown:.0f}s after {self.failures} failures")
+
+    def record_throttled(self, now: float, retry_after: Optional[float]):
+        # 429: the quota is gone, so open at once and wait out Retry-After
+        # (capped) instead of burning more requests on it
+        with self._lock:
+            self.failures += 1
+            self.state = "open"
+            self.opened_at = now
+            self.cooldown = min(max(retry_after or self.base_cooldown, self.base_cooldown), self.max_cooldown)
+            log_news_error(f"{self.name} rate limited, circuit open for {self.cooldown:.0f}s")
+
+def retry_after_seconds(resp: Optional[requests.Response]) -> Optional[float]:
+    value = (resp.headers.get("Retry-After") or "").strip() if resp is not None else ""
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
     try:
-        if GDELT_ENABLED:
-            items.extend(fetch_from_gdelt())
-    except Exception as e:
-        log_news_error(f"Error fetching GDELT: {e}")
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class NewsProvider:
+    def __init__(self, name: str, fetch, interval: float, enabled: bool = True, max_items: int = 60):
+        self.name = name
+        self.fetch = fetch
+        self.max_items = max_items  # new on-topic stories per refresh before we stop pulling
+        self.interval = float(os.environ.get(f"NEWS_INTERVAL_{re.sub(r'[^A-Z0-9]', '', name.upper())}", interval))
+        self.enabled = enabled
+        self.breaker = CircuitBreaker(name)
+        self.next_due = 0.0
+        self.running = False
+
+    def is_due(self, now: float) -> bool:
+        return self.enabled and not self.running and now >= self.next_due and self.breaker.allow(now)
+
+    def status(self) -> Dict[str, Any]:
+        return {"name": self.name, "enabled": self.enabled, "interval": self.interval, "state": self.breaker.state,
+                "failures": self.breaker.failures, "next_due": int(self.next_due), "items": news_store.count(self.name)}
 
-    # CommonCrawl is left as a stub; uncomment if/when implemented
+NEWS_PROVIDERS = [
+    NewsProvider("RSS", lambda: fetch_from_rss(), interval=180, max_items=80),
+    NewsProvider("NewsAPI", lambda: fetch_from_newsapi(NEWSAPI_KEY), interval=1800, enabled=bool(NEWSAPI_KEY)),
+    NewsProvider("GNews", lambda: fetch_from_gnews(GNEWS_KEY), interval=1800, enabled=bool(GNEWS_KEY)),
+    NewsProvider("Mediastack", lambda: fetch_from_mediastack(MEDIASTACK_KEY), interval=5400, enabled=bool(MEDIASTACK_KEY)),
+    NewsProvider("NewsData", lambda: fetch_from_newsdata(NEWSDATA_KEY), interval=1800, enabled=bool(NEWSDATA_KEY)),
+    NewsProvider("TheNewsAPI", lambda: fetch_from_thenewsapi(THENEWSAPI_KEY), interval=1800, enabled=bool(THENEWSAPI_KEY)),
+    NewsProvider("ContextualWeb", lambda: fetch_from_contextualweb_rapidapi(RAPIDAPI_KEY, RAPIDAPI_HOST), interval=1800,
+                 enabled=bool(RAPIDAPI_KEY and RAPIDAPI_HOST)),
+    NewsProvider("Webz", lambda: fetch_from_webz(WEBZ_KEY), interval=2700, enabled=bool(WEBZ_KEY)),
+    NewsProvider("Guardian", lambda: fetch_from_guardian(GUARDIAN_KEY), interval=600, enabled=bool(GUARDIAN_KEY)),
+    NewsProvider("NYTimes", lambda: fetch_from_nytimes(NYTIMES_KEY), interval=600, enabled=bool(NYTIMES_KEY)),
+    NewsProvider("Newscatcher", lambda: fetch_from_newscatcher(NEWSCATCHER_KEY), interval=1800, enabled=bool(NEWSCATCHER_KEY)),
+    NewsProvider("GDELT", lambda: fetch_from_gdelt(), interval=900, enabled=GDELT_ENABLED),
+    # CommonCrawl is left as a stub; it only logs, so poll it once a day
+    NewsProvider("CommonCrawl", lambda: fetch_from_commoncrawl_stub(), interval=86400),
+]
+
+# === Aggregator ===
+# Due providers run concurrently on a bounded pool; a refresh never waits
+# longer than NEWS_REFRESH_DEADLINE for stragglers.
+NEWS_REFRESH_WORKERS = int(os.environ.get("NEWS_REFRESH_WORKERS", "6"))
+NEWS_REFRESH_DEADLINE = float(os.environ.get("NEWS_REFRESH_DEADLINE", "20"))
+
+# Fetchers only normalize; select_news is the single filter/dedupe/rank/
+# truncate pass over the store. Same store + same seed = same list. The seed
+# defaults to the hour, so the mix changes over the day but not per refresh.
+NEWS_CACHE_MAX = int(os.environ.get("NEWS_CACHE_MAX", "120"))
+NEWS_RANK_SEED = os.environ.get("NEWS_RANK_SEED", "")
+NEWS_RECENCY_HOURS = 6.0      # score halves once an item is this old
+NEWS_KEYWORD_WEIGHT = 0.25    # per matched keyword
+NEWS_PROVIDER_DECAY = 0.85    # per item already taken from the same provider
+NEWS_RANK_JITTER = 0.2
+
+def select_news(entries: List[Dict[str, Any]], max_items: int = NEWS_CACHE_MAX, seed: Any = 0,
+                now: float = None) -> List[Article]:
+    now = now or time.time()
+    rng = random.Random(seed)
+    seen_titles = set()
+    queues: Dict[str, List[tuple]] = {}
+    for e in sorted(entries, key=lambda e: e["key"]):
+        article = e["article"]
+        if not article.title.strip() or not article.keywords:
+            continue
+        headline = " ".join(headline_tokens(article.title))
+        if headline in seen_titles:
+            continue
+        seen_titles.add(headline)
+        age_h = max(0.0, now - e["first_seen"]) / 3600
+        score = ((1 + len(e.get("copies", ()))) * (1 + NEWS_KEYWORD_WEIGHT * len(article.keywords))
+                 / (1 + age_h / NEWS_RECENCY_HOURS) * (1 + NEWS_RANK_JITTER * rng.random()))
+        queues.setdefault(e["provider"], []).append((score, e["key"], article))
+
+    # Interleave providers: always take the best next item, discounting a
+    # provider a little for each item it already placed, so one busy source
+    # can't fill the list.
+    heap = []
+    for provider, queue_ in queues.items():
+        queue_.sort(key=lambda q: (-q[0], q[1]))
+        heap.append((-queue_[0][0], provider, 0))
+    heapq.heapify(heap)
+    out = []
+    while heap and len(out) < max_items:
+        _, provider, i = heapq.heappop(heap)
+        queue_ = queues[provider]
+        out.append(queue_[i][2])
+        if i + 1 < len(queue_):
+            heapq.heappush(heap, (-queue_[i + 1][0] * NEWS_PROVIDER_DECAY ** (i + 1), provider, i + 1))
+    return out
+
+# Shared across refreshes so a provider still hanging from the previous cycle
+# counts against the same bound instead of piling up extra threads.
+_fetch_pool = ThreadPoolExecutor(max_workers=NEWS_REFRESH_WORKERS, thread_name_prefix="news-fetch")
+
+# Providers stream into the store in small batches and stop pulling once they
+# have added max_items new on-topic stories, or once the refresh as a whole has
+# NEWS_CACHE_MAX of them; closing the generator drops whatever it hadn't
+# requested yet (e.g. the remaining RSS feeds).
+NEWS_STREAM_BATCH = 10
+
+class RefreshBudget:
+    def __init__(self, target: int):
+        self.target = target
+        self._added = 0
+        self._lock = threading.Lock()
+
+    def add(self, n: int):
+        with self._lock:
+            self._added += n
+
+    def done(self) -> bool:
+        return self._added >= self.target
+
+def run_provider(provider: NewsProvider, budget: Optional[RefreshBudget] = None):
+    items = None
     try:
-        items.extend(fetch_from_commoncrawl_stub())
+        items = provider.fetch()
+        added = 0
+        while added < provider.max_items and not (budget and budget.done()):
+            batch = list(itertools.islice(items, NEWS_STREAM_BATCH))
+            if not batch:
+                break
+            n = news_store.upsert(provider.name, batch)
+            added += n
+            if budget:
+                budget.add(n)
+    except requests.HTTPError as e:
+        log_news_error(f"{provider.name} fetch error: {e}")
+        if e.response is not None and e.response.status_code == 429:
+            provider.breaker.record_throttled(time.time(), retry_after_seconds(e.response))
+        else:
+            provider.breaker.record_failure(time.time())
     except Exception as e:
-        log_news_error(f"Error fetching CommonCrawl stub: {e}")
+        log_news_error(f"{provider.name} fetch error: {e}")
+        provider.breaker.record_failure(time.time())
+    else:
+        provider.breaker.record_success()
+    finally:
+        try:
+            getattr(items, "close", lambda: None)()
+        except Exception as e:
+            log_news_error(f"{provider.name} close error: {e}")
+        provider.next_due = time.time() + provider.interval
+        provider.running = False
+
+def fetch_all_providers(providers: List[NewsProvider], deadline_sec: float = NEWS_REFRESH_DEADLINE):
+    for p in providers:
+        p.running = True
+    budget = RefreshBudget(NEWS_CACHE_MAX)
+    # run_provider stores each result on its provider as soon as it lands; a
+    # provider that misses the deadline still lands there for the next refresh.
+    futures = {_fetch_pool.submit(run_provider, p, budget): p for p in providers}
+    _, late = wait(futures, timeout=deadline_sec)
+    if late:
+        for fut in late:
+            if fut.cancel():
+                futures[fut].running = False
+        log_news_error(f"Refresh deadline ({deadline_sec:.0f}s) hit, skipped: {', '.join(sorted(futures[f].name for f in late))}")
+
+def fetch_and_cache_all(force: bool = False) -> NewsSnapshot:
+    now = time.time()
+    due = [p for p in NEWS_PROVIDERS if p.is_due(now) or (force and p.enabled and not p.running)]
+    fetch_all_providers(due)
 
-    # Normalize and dedupe + final filter
-    combined = dedupe_and_filter(items, max_items=120)
+    # The store still holds the last good items of providers that were not due
+    # (or are failing); only age evicts them.
+    news_store.evict()
+    news_store.save()
+
+    seed = NEWS_RANK_SEED or int(now // 3600)
+    combined = select_news(news_store.entries(), NEWS_CACHE_MAX, seed=seed, now=now)
 
     if not combined:
-        combined = [{"title": "Waiting for tech news...", "description": "Loading the latest technology news and updates...", "link": "", "source": "System", "published": ""}]
+        combined = [Article("Waiting for tech news...", "Loading the latest technology news and updates...", "", "System", "")]
 
-    cache = {"generated": int(time.time()), "items": combined}
-    try:
-        NEWS_CACHE.write_text(json.dumps(cache, indent=2, ensure_ascii=False), encoding="utf-8")
-    except Exception as e:
-        log_news_error(f"Cache write error: {e}")
-    return cache
+    snap = publish_news_snapshot({"generated": int(time.time()), "items": combined})
+    durable_writer.write(NEWS_CACHE, snap.bodies["identity"].decode("utf-8"))
+    return snap
 
 # === Background fetch thread ===
-def news_background_loop(interval_sec: int = 300):
-    # Fetch immediately on startup
+# Only one process per host fetches (outbound quota is per API key, not per
+# process); the others serve whatever the leader last wrote to NEWS_CACHE.
+NEWS_LEADER_LOCK = Path(os.environ.get("NEWS_LEADER_LOCK", str(BASE_DIR / ".news_fetcher.lock")))
+
+def news_background_loop(stop: threading.Event, tick_sec: int = NEWS_SCHEDULER_TICK):
+    # Fetch everything immediately on startup (or on taking over as leader)
     try:
-        fetch_and_cache_all()
+        fetch_and_cache_all(force=True)
     except Exception as e:
         log_news_error(f"Initial fetch error: {e}")
-    while True:
+    while not stop.wait(tick_sec):
         try:
-            time.sleep(interval_sec)
-            fetch_and_cache_all()
+            if any(p.is_due(time.time()) for p in NEWS_PROVIDERS):
+                fetch_and_cache_all()
         except Exception as e:
             log_news_error(f"Background loop error: {e}")
+    _fetch_pool.shutdown(wait=False, cancel_futures=True)
 
-threading.Thread(target=news_background_loop, args=(300,), daemon=True).start()
+news_leader = LeaderLock(NEWS_LEADER_LOCK)
+if ADMIN_ROLE != "worker":
+    services.add("news-fetcher", news_background_loop, lock=news_leader)
 
 # === VLC helper ===
-def play_vlc(path: str, loop: bool = True):
-    args = [
-        "cvlc", "--quiet", "--no-osd", "--no-video-title-show", "--intf", "dummy",
-        "--fullscreen", "--video-filter=transform", "--transform-type=270",
-        "--aspect-ratio=9:16", "--autoscale", str(path)
-    ]
+VLC_ARGS = ["--quiet", "--no-osd", "--no-video-title-show", "--autoscale"]
+# Live rotation for uploads that have no pre-rotated rendition yet
+VLC_ROTATE_ARGS = ["--video-filter=transform", "--transform-type=270", "--aspect-ratio=9:16"]
+
+def play_vlc(path: str, loop: bool = True, display: str = "", rotate: bool = True):
+    args = ["cvlc", *VLC_ARGS[:3], "--intf", "dummy", "--fullscreen", *(VLC_ROTATE_ARGS if rotate else []), *VLC_ARGS[3:], str(path)]
     if loop:
         args.insert(1, "--loop")
-    return subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True, close_fds=True)
+    env = dict(os.environ, DISPLAY=display) if display else None
+    return subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True, close_fds=True, env=env)
+
+# === Video store ===
+# Uploaded bytes are stored once per content hash in BLOB_DIR/<ab>/<sha256>.
+# The names in VIDEO_DIR are hard links to those blobs, so everything that
+# opens VIDEO_DIR/<name> keeps working, the same promo under two names costs
+# the disk once, and replacing a name swaps the link atomically; a player that
+# still has the old file open keeps reading the old blob. The name -> hash
+# aliases live in video_aliases.json; a blob (and its rendition) is deleted
+# once no alias refers to it any more.
+UPLOAD_BUFFER = 1 << 20  # streaming block size for hashing/copying uploads
+
+class VideoStore:
+    def __init__(self, blob_dir: Path, alias_file: Path):
+        self.blob_dir = blob_dir
+        self.alias_file = alias_file
+        self.aliases: Dict[str, str] = {}
+        self._stats: Dict[str, tuple] = {}  # name -> (size, mtime_ns, inode) when last hashed or linked
+        self._lock = threading.RLock()
+        self._warned_copy = False
+        self.reload()
+
+    def reload(self):
+        try:
+            text = durable_writer.read_text(self.alias_file)
+            self.aliases = json.loads(text) if text else {}
+        except Exception as e:
+            log_news_error(f"Video alias read error: {e}")
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def digest(self, name: str) -> Optional[str]:
+        return self.aliases.get(name)
+
+    def refcounts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(collections.Counter(self.aliases.values()))
+
+    def _save(self):
+        durable_writer.write(self.alias_file, json.dumps(self.aliases, indent=2))
+
+    def _link(self, blob: Path, dest: Path, copy: bool = True):
+        tmp = dest.with_name(f".{dest.name}.link")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(blob, tmp)
+        except OSError as e:
+            # e.g. a FAT-formatted card: still correct, just no dedupe
+            if not self._warned_copy:
+                log_news_error(f"Hard links unavailable ({e}); copying videos instead")
+                self._warned_copy = True
+            if not copy:
+                return  # dest already holds these bytes; a copy would only bump its mtime
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, dest)
+
+    def _remember(self, name: str):
+        st = (VIDEO_DIR / name).stat()
+        self._stats[name] = (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def _unchanged(self, path: Path) -> bool:
+        digest = self.aliases.get(path.name)
+        if not digest or not self.blob_path(digest).exists():
+            return False
+        st = path.stat()
+        seen = self._stats.get(path.name)
+        if seen:
+            # also catches an in-place rewrite, which a hard link would share
+            return seen == (st.st_size, st.st_mtime_ns, st.st_ino)
+        return os.path.samefile(path, self.blob_path(digest))
+
+    def ingest_file(self, tmp: Path, name: str, digest: str) -> Path:
+        """Move a fully written, fsynced file into the store under `name`."""
+        blob = self.blob_path(digest)
+        dest = VIDEO_DIR / name
+        with self._lock:
+            if blob.exists():
+                tmp.unlink()  # same bytes already stored
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, blob)
+            self._link(blob, dest)
+            self._remember(name)
+            old = self.aliases.get(name)
+            self.aliases[name] = digest
+            self._save()
+            if old and old != digest:
+                self.gc()
+        return dest
+
+    def ingest_stream(self, stream, name: str) -> Path:
+        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(UPLOAD_DIR), suffix=".part")
+        h = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for block in iter(lambda: stream.read(UPLOAD_BUFFER), b""):
+                    f.write(block)
+                    h.update(block)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return self.ingest_file(Path(tmp), name, h.hexdigest())
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            if name not in self.aliases:
+                return False
+            del self.aliases[name]
+            self._stats.pop(name, None)
+            (VIDEO_DIR / name).unlink(missing_ok=True)
+            self._save()
+            self.gc()
+            return True
+
+    def gc(self) -> int:
+        removed = 0
+        with self._lock:
+            live = set(self.aliases.values())
+            for blob in self.blob_dir.glob("??/*"):
+                if blob.name in live or blob.name.startswith("."):
+                    continue
+                blob.unlink(missing_ok=True)
+                removed += 1
+            for rendition in RENDITION_DIR.glob("*.mp4"):
+                digest = rendition.name[:-len(".mp4")]
+                if re.fullmatch(r"[0-9a-f]{64}", digest) and digest not in live:
+                    rendition.unlink(missing_ok=True)
+            media_index.prune(live)
+        if removed:
+            log_news_error(f"Video store: collected {removed} unreferenced blob(s)")
+        return removed
+
+    def adopt_existing(self):
+        """Bring files that were copied into VIDEO_DIR by hand (or predate the
+        store) under content addressing, then drop blobs nobody references."""
+        with self._lock:
+            for path in sorted(VIDEO_DIR.iterdir()):
+                if not path.is_file() or path.name.startswith("."):
+                    continue
+                if time.time() - path.stat().st_mtime < VIDEO_SETTLE_SEC:
+                    continue  # probably still being copied in; next rescan
+                if self._unchanged(path):
+                    continue
+                digest = file_sha256(path)
+                blob = self.blob_path(digest)
+                if blob.exists():
+                    if not os.path.samefile(path, blob):
+                        self._link(blob, path, copy=False)
+                else:
+                    blob.parent.mkdir(parents=True, exist_ok=True)
+                    try:
+                        os.link(path, blob)
+                    except OSError:
+                        shutil.copyfile(path, blob)
+                self.aliases[path.name] = digest
+                self._remember(path.name)
+            for name in [n for n in self.aliases if not (VIDEO_DIR / n).is_file()]:
+                del self.aliases[name]
+                self._stats.pop(name, None)
+            self._save()
+            self.gc()
+
+    def names(self) -> List[str]:
+        # what is on disk right now, adopted or not (the rescan catches up)
+        return sorted(p.name for p in VIDEO_DIR.iterdir() if p.is_file() and not p.name.startswith("."))
+
+VIDEO_RESCAN_SEC = float(os.environ.get("VIDEO_RESCAN_SEC", "60"))
+VIDEO_SETTLE_SEC = 10.0  # unchanged for this long before a hand-copied file is adopted
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(UPLOAD_BUFFER), b""):
+            h.update(block)
+    return h.hexdigest()
+
+video_store = VideoStore(BLOB_DIR, ALIAS_FILE)
+
+# === Video metadata index ===
+# Duration, resolution, codec, size and a poster frame are probed once per blob
+# (on the ingest worker, right after upload) and kept in video_index.json keyed
+# by content hash. The admin page, /idle and playback read from here and never
+# run ffprobe themselves.
+FFPROBE_BIN = os.environ.get("FFPROBE_BIN", "ffprobe")
+POSTER_WIDTH = 320
+
+class MediaIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        try:
+            text = durable_writer.read_text(path)
+            self.entries = json.loads(text) if text else {}
+        except Exception as e:
+            log_news_error(f"Video index read error: {e}")
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        digest = video_store.digest(name)
+        return self.entries.get(digest) if digest else None
+
+    def complete(self, name: str) -> bool:
+        return "duration" in (self.get(name) or {})
+
+    def _save(self):
+        with self._lock:
+            text = json.dumps(self.entries, separators=(",", ":"))
+        durable_writer.write(self.path, text)
+
+    def probe(self, src: Path) -> Optional[Dict[str, Any]]:
+        digest = video_store.digest(src.name)
+        if not digest or self.complete(src.name) or not src.is_file():
+            return self.get(src.name)
+        entry: Dict[str, Any] = {"size": src.stat().st_size}
+        if shutil.which(FFPROBE_BIN):
+            try:
+                out = subprocess.run([FFPROBE_BIN, "-v", "error", "-select_streams", "v:0",
+                                      "-show_entries", "stream=codec_name,width,height:format=duration",
+                                      "-of", "json", str(src)],
+                                     capture_output=True, check=True, timeout=60).stdout
+                info = json.loads(out or b"{}")
+                stream = (info.get("streams") or [{}])[0]
+                entry.update({"duration": round(float(info.get("format", {}).get("duration") or 0), 2),
+                              "width": int(stream.get("width") or 0), "height": int(stream.get("height") or 0),
+                              "codec": stream.get("codec_name", "")})
+                entry["poster"] = self._poster(src, digest, entry["duration"])
+            except Exception as e:
+                log_news_error(f"Probe failed for {src.name}: {e}")
+        else:
+            log_news_error(f"Probe skipped for {src.name}: {FFPROBE_BIN} not found")
+        with self._lock:
+            self.entries[digest] = entry
+        self._save()
+        return entry
+
+    def _poster(self, src: Path, digest: str, duration: float) -> str:
+        POSTER_DIR.mkdir(parents=True, exist_ok=True)
+        dst = POSTER_DIR / f"{digest}.jpg"
+        try:
+            subprocess.run([FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y", "-ss", f"{min(1.0, duration / 2):.2f}",
+                            "-i", str(src), "-frames:v", "1", "-vf", f"scale={POSTER_WIDTH}:-2", "-q:v", "4", str(dst)],
+                           stdin=subprocess.DEVNULL, capture_output=True, check=True, timeout=60)
+            return dst.name if dst.exists() else ""
+        except Exception as e:
+            log_news_error(f"Poster failed for {src.name}: {e}")
+            return ""
+
+    def prune(self, live):
+        with self._lock:
+            dead = [d for d in self.entries if d not in live]
+            for digest in dead:
+                del self.entries[digest]
+                (POSTER_DIR / f"{digest}.jpg").unlink(missing_ok=True)
+        if dead:
+            self._save()
+
+media_index = MediaIndex(VIDEO_INDEX_FILE)
+
+# === Transcode pipeline ===
+# Uploads are re-encoded once, in the background, into a rendition that is
+# already rotated (the same 270 degrees as the live VLC transform) and
+# letterboxed to the kiosk's native portrait resolution in plain H.264/yuv420p,
+# which the kiosk can hardware-decode. Playback then needs no video filter.
+# Set TRANSCODE_CODEC=h264_v4l2m2m (Raspberry Pi) or h264_vaapi (Intel/AMD,
+# frames are uploaded to VAAPI_DEVICE as nv12) to encode in hardware too.
+# ffmpeg runs under `nice` so it does not starve playback. FFMPEG_BIN may
+# point at a stub for testing.
+FFMPEG_BIN = os.environ.get("FFMPEG_BIN", "ffmpeg")
+KIOSK_WIDTH = int(os.environ.get("KIOSK_WIDTH", "1080"))
+KIOSK_HEIGHT = int(os.environ.get("KIOSK_HEIGHT", "1920"))
+TRANSCODE_CODEC = os.environ.get("TRANSCODE_CODEC", "libx264")
+TRANSCODE_PRESET = os.environ.get("TRANSCODE_PRESET", "veryfast")
+TRANSCODE_TIMEOUT = float(os.environ.get("TRANSCODE_TIMEOUT", str(3 * 3600)))
+TRANSCODE_NICE = int(os.environ.get("TRANSCODE_NICE", "10"))
+VAAPI_DEVICE = os.environ.get("VAAPI_DEVICE", "/dev/dri/renderD128")
+
+def rendition_path(src: Path) -> Path:
+    # Keyed by content hash, so every alias of a blob shares one rendition
+    return RENDITION_DIR / f"{video_store.digest(src.name) or src.name}.mp4"
+
+def current_rendition(src: Path) -> Optional[Path]:
+    # A rendition older than its source belongs to a previous upload of that name
+    dst = rendition_path(src)
+    try:
+        return dst if dst.stat().st_mtime >= src.stat().st_mtime else None
+    except OSError:
+        return None
+
+def transcode_args(src: Path, dst: Path) -> List[str]:
+    w, h = KIOSK_WIDTH, KIOSK_HEIGHT
+    vaapi = TRANSCODE_CODEC.endswith("_vaapi")
+    vf = (f"transpose=2,scale={w}:{h}:force_original_aspect_ratio=decrease,"
+          f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:black,setsar=1," + ("format=nv12,hwupload" if vaapi else "format=yuv420p"))
+    if TRANSCODE_CODEC == "libx264":
+        codec = ["-preset", TRANSCODE_PRESET, "-crf", "20", "-profile:v", "high"]
+    elif vaapi:
+        codec = ["-qp", "20"]  # the encoder picks the profile for nv12 surfaces
+    else:
+        codec = ["-profile:v", "high"]
+    return [*(["nice", "-n", str(TRANSCODE_NICE)] if TRANSCODE_NICE and shutil.which("nice") else []),
+            FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y",
+            *(["-vaapi_device", VAAPI_DEVICE] if vaapi else []), "-i", str(src), "-vf", vf,
+            "-c:v", TRANSCODE_CODEC, *codec, "-g", "60", "-c:a", "aac", "-b:a", "128k",
+            "-movflags", "+faststart", "-f", "mp4", str(dst)]
+
+class TranscodeQueue:
+    def __init__(self):
+        self.jobs: Dict[str, str] = {}  # file name -> queued | running | done | failed | skipped
+        # content digest -> failed | skipped; the rescan leaves these alone until
+        # a new upload (new digest) or retry()
+        self.given_up: Dict[str, str] = {}
+        self._queue: "queue.Queue[Path]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def enqueue(self, src: Path):
+        with self._lock:
+            # a running job may be encoding the previous upload of this name, so only
+            # a queued one makes a new job redundant
+            if self.jobs.get(src.name) == "queued":
+                return
+            if current_rendition(src) is not None and media_index.complete(src.name):
+                self.jobs[src.name] = "done"
+                return
+            self.jobs[src.name] = "queued"
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="transcode", daemon=True)
+                self._worker.start()
+        self._queue.put(src)
+
+    def enqueue_missing(self):
+        for src in sorted(VIDEO_DIR.iterdir()):
+            digest = video_store.digest(src.name)
+            if not digest or digest in self.given_up:
+                continue  # not adopted yet, or already failed on these bytes
+            if src.is_file() and (current_rendition(src) is None or not media_index.complete(src.name)):
+                self.enqueue(src)
+
+    def retry(self, name: Optional[str] = None) -> List[str]:
+        with self._lock:
+            digests = {video_store.digest(name)} if name else set(self.given_up)
+            for digest in digests:
+                self.given_up.pop(digest, None)
+        names = [n for n, d in list(video_store.aliases.items()) if d in digests]
+        for n in names:
+            self.enqueue(VIDEO_DIR / n)
+        return names
+
+    def _run(self):
+        while True:
+            src = self._queue.get()
+            try:
+                media_index.probe(src)
+            except Exception as e:
+                log_news_error(f"Probe failed for {src.name}: {e}")
+            result = self.jobs[src.name] = self._transcode(src)
+            digest = video_store.digest(src.name)
+            if digest and result == "done" and not media_index.complete(src.name):
+                result = "failed"  # rendition made, but the probe keeps failing
+            with self._lock:
+                if digest and result in ("failed", "skipped"):
+                    self.given_up[digest] = result
+
+    def _transcode(self, src: Path) -> str:
+        if not shutil.which(FFMPEG_BIN):
+            log_news_error(f"Transcode skipped for {src.name}: {FFMPEG_BIN} not found")
+            return "skipped"
+        if not src.is_file():
+            return "failed"
+        if current_rendition(src) is not None:
+            return "done"
+        self.jobs[src.name] = "running"
+        RENDITION_DIR.mkdir(parents=True, exist_ok=True)
+        dst = rendition_path(src)
+        tmp = dst.with_name(f".{dst.name}.part")
+        try:
+            subprocess.run(transcode_args(src, tmp), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.PIPE, check=True, timeout=TRANSCODE_TIMEOUT)
+            os.replace(tmp, dst)
+            return "done"
+        except subprocess.CalledProcessError as e:
+            log_news_error(f"Transcode failed for {src.name}: {e.stderr.decode('utf-8', 'ignore').strip()[-300:]}")
+        except Exception as e:
+            log_news_error(f"Transcode failed for {src.name}: {e}")
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return "failed"
+
+transcoder = TranscodeQueue()
+
+# Files copied into VIDEO_DIR by hand are adopted into the store, probed and
+# transcoded on service start and then every VIDEO_RESCAN_SEC.
+
+def video_adopt_loop(stop: threading.Event):
+    while True:
+        try:
+            video_store.adopt_existing()
+            transcoder.enqueue_missing()
+        except Exception as e:
+            log_news_error(f"Video rescan error: {e}")
+        if stop.wait(VIDEO_RESCAN_SEC):
+            return
+
+if ADMIN_ROLE != "worker":
+    services.add("video-adopt", video_adopt_loop)
+
+# === Playback engine ===
+# A card tap should not pay for process start-up, plugin loading and filter
+# set-up. PlaybackEngine keeps one libvlc instance and fullscreen player
+# resident and only swaps the media on each tap; Media objects are created and
+# pre-parsed once per file. `available` is False without python-vlc/libvlc.
+class PlaybackEngine:
+    def __init__(self, display: str = ""):
+        self.display = display
+        self.available = vlc is not None
+        self.last_latency_ms: Optional[float] = None
+        self._instance = None
+        self._player = None
+        self._media: Dict[str, Any] = {}
+        self._tap_at = 0.0
+        self._lock = threading.Lock()
+
+    def warm(self, preload=()) -> bool:
+        with self._lock:
+            if self.available and self._player is None:
+                try:
+                    args = VLC_ARGS + ([f"--x11-display={self.display}"] if self.display else [])
+                    self._instance = vlc.Instance(args)
+                    self._player = self._instance.media_player_new()
+                    self._player.set_fullscreen(True)
+                    self._player.event_manager().event_attach(vlc.EventType.MediaPlayerVout, self._on_vout)
+                except Exception as e:
+                    log_news_error(f"VLC engine init failed, falling back to cvlc: {e}")
+                    self.available = False
+            if self.ready:
+                for path in preload:
+                    rendition = current_rendition(Path(path))
+                    self._media_for(str(rendition or path), rotate=rendition is None)
+            return self.ready
+
+    def _media_for(self, path: str, rotate: bool = True):
+        media = self._media.get(path)
+        if media is None:
+            media = self._instance.media_new_path(path)
+            media.add_option("input-repeat=65535")  # loop, like cvlc --loop
+            if rotate:
+                for opt in VLC_ROTATE_ARGS:
+                    media.add_option(opt[2:])
+            media.parse_with_options(vlc.MediaParseFlag.local, 0)  # probe now, not on tap
+            self._media[path] = media
+        return media
+
+    def _on_vout(self, event):
+        # Fired when the video output comes up, i.e. right before the first frame.
+        if self._tap_at:
+            self.last_latency_ms = round((time.perf_counter() - self._tap_at) * 1000, 1)
+            self._tap_at = 0.0
+
+    def play(self, path: Path, rotate: bool = True):
+        with self._lock:
+            media = self._media_for(str(path), rotate)
+            self._tap_at = time.perf_counter()
+            self._player.set_media(media)
+            self._player.play()
+
+    def stop(self):
+        with self._lock:
+            if self.ready:
+                self._player.stop()
+
+    @property
+    def ready(self) -> bool:
+        return self._player is not None
+
+    def failed(self) -> bool:
+        return self.ready and self._player.get_state() == vlc.State.Error
+
+# === Playback supervisor ===
+# Exactly one player per output. A new tap preempts whatever is playing there;
+# a cvlc child is terminated (whole process group) and reaped instead of being
+# left to loop forever. A watcher thread restarts a player that dies on its
+# own, up to PLAYBACK_RESTART_LIMIT times per PLAYBACK_RESTART_WINDOW seconds.
+# Outputs come from PLAYBACK_OUTPUTS, e.g. "main=:0,lobby=:1".
+PLAYBACK_OUTPUTS = os.environ.get("PLAYBACK_OUTPUTS", "main")
+PLAYBACK_WATCH_SEC = float(os.environ.get("PLAYBACK_WATCH_SEC", "1"))
+PLAYBACK_RESTART_LIMIT = int(os.environ.get("PLAYBACK_RESTART_LIMIT", "5"))
+PLAYBACK_RESTART_WINDOW = float(os.environ.get("PLAYBACK_RESTART_WINDOW", "60"))
+
+class PlaybackSupervisor:
+    def __init__(self, output: str, display: str = ""):
+        self.output = output
+        self.display = display
+        self.engine = PlaybackEngine(display)
+        self.state = "idle"  # idle | playing | failed
+        self.current: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at = 0.0
+        self.proc = None
+        self._restarts = collections.deque()
+        self._lock = threading.RLock()
+        self._watcher = None
+
+    def play(self, path: Path) -> bool:
+        # False (state "failed", reason in .error) when no player could be
+        # started, e.g. neither libvlc nor cvlc is installed.
+        with self._lock:
+            self.current = str(path)
+            self._restarts.clear()
+            try:
+                self._start()
+            except Exception as e:
+                self._fail(e)
+                return False
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name=f"playback-{self.output}", daemon=True)
+                self._watcher.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            self._stop_process()
+            self.engine.stop()
+            self.state = "idle"
+            self.current = None
+            self.error = None
+
+    def _start(self):
+        self._stop_process()
+        src = Path(self.current)
+        rendition = current_rendition(src)
+        if self.engine.warm():
+            self.engine.play(rendition or src, rotate=rendition is None)
+        else:
+            self.proc = play_vlc(str(rendition or src), display=self.display, rotate=rendition is None)
+        self.state = "playing"
+        self.error = None
+        self.started_at = time.time()
+
+    def _fail(self, e: Exception):
+        self._stop_process()
+        self.state = "failed"
+        self.error = f"{type(e).__name__}: {e}"
+        log_news_error(f"Playback on {self.output} failed for {self.current}: {self.error}")
+
+    def _stop_process(self):
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        if proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGTERM)
+                proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.wait()
+            except ProcessLookupError:
+                proc.wait()
+
+    def _crashed(self) -> bool:
+        if self.proc is not None:
+            return self.proc.poll() is not None  # poll() also reaps it
+        return self.engine.failed()
+
+    def _watch(self):
+        while True:
+            time.sleep(PLAYBACK_WATCH_SEC)
+            with self._lock:
+                if self.state != "playing" or not self._crashed():
+                    continue
+                now = time.time()
+                while self._restarts and now - self._restarts[0] > PLAYBACK_RESTART_WINDOW:
+                    self._restarts.popleft()
+                if len(self._restarts) >= PLAYBACK_RESTART_LIMIT:
+                    log_news_error(f"Playback on {self.output} keeps crashing, giving up on {self.current}")
+                    self._stop_process()
+                    self.state = "failed"
+                    continue
+                self._restarts.append(now)
+                log_news_error(f"Playback on {self.output} crashed, restarting {self.current}")
+                try:
+                    self._start()
+                except Exception as e:
+                    self._fail(e)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"output": self.output, "state": self.state, "error": self.error,
+                    "file": self.current and os.path.basename(self.current),
+                    "backend": "libvlc" if self.engine.ready else "cvlc",
+                    "pid": self.proc.pid if self.proc else None, "restarts": len(self._restarts),
+                    "uptime": round(time.time() - self.started_at, 1) if self.state == "playing" else 0,
+                    "duration": (self.current and (media_index.get(os.path.basename(self.current)) or {}).get("duration")),
+                    "latency_ms": self.engine.last_latency_ms}
+
+def parse_outputs(spec: str) -> Dict[str, str]:
+    outputs = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, display = part.partition("=")
+        outputs[name.strip()] = display.strip() or os.environ.get("DISPLAY", "")
+    return outputs or {"main": os.environ.get("DISPLAY", "")}
+
+playback_outputs = {name: PlaybackSupervisor(name, display) for name, display in parse_outputs(PLAYBACK_OUTPUTS).items()}
+playback = next(iter(playback_outputs.values()))  # default output
+atexit.register(lambda: [sup.stop() for sup in playback_outputs.values()])
 
 # === Map helpers ===
-def load_map():
-    return json.loads(MAP_FILE.read_text(encoding="utf-8")) if MAP_FILE.exists() else {}
+# The UID -> video table is held in memory and only re-parsed when
+# video_map.json changes on disk (mtime/size/inode), e.g. after a hand edit.
+# Readers get a read-only view of a dict that is never mutated once published,
+# so a card-tap lookup is one stat plus one dict get, with no copy. Writes
+# build a new dict, swap it in and queue the file write on durable_writer.
+class VideoMapIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        self._view: Mapping[str, str] = MappingProxyType({})
+        self._stat = None
+        self._lock = threading.Lock()
+
+    def _disk_stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self):
+        stat = self._disk_stat()
+        if stat == self._stat:
+            return
+        with self._lock:
+            if stat == self._stat:
+                return
+            try:
+                text = durable_writer.read_text(self.path)
+                self._view = MappingProxyType(json.loads(text) if text else {})
+            except Exception as e:
+                log_news_error(f"Video map read error: {e}")
+            self._stat = stat
+
+    def view(self) -> Mapping[str, str]:
+        self._refresh()
+        return self._view
+
+    def lookup(self, uid: str) -> Optional[str]:
+        return self.view().get(uid.strip().upper())
+
+    def _publish(self, new: Dict[str, str]):
+        self._view = MappingProxyType(new)
+        durable_writer.write(self.path, json.dumps(new, indent=2))
+
+    def set(self, uid: str, fname: str):
+        self._refresh()
+        with self._lock:
+            new = dict(self._view)
+            new[uid] = fname
+            self._publish(new)
+
+    def delete(self, uid: str) -> bool:
+        self._refresh()
+        with self._lock:
+            if uid not in self._view:
+                return False
+            new = dict(self._view)
+            del new[uid]
+            self._publish(new)
+            return True
+
+video_map_index = VideoMapIndex(MAP_FILE)
+
+def load_map() -> Mapping[str, str]:
+    return video_map_index.view()
+
+# === RFID reader service ===
+# Reads card UIDs from a reader device and feeds them to playback through a
+# bounded queue. Two kinds of device node are supported:
+#   - serial / tty readers that print one UID per line (RFID_READER=/dev/ttyUSB0)
+#   - USB "keyboard wedge" readers via evdev (RFID_READER=/dev/input/event3),
+#     which type the UID followed by Enter
+# A card resting on the reader is reported over and over; repeats of the same
+# UID within RFID_DEBOUNCE_SEC are dropped so they don't restart playback.
+RFID_READER = os.environ.get("RFID_READER", "").strip()
+RFID_BAUD = int(os.environ.get("RFID_BAUD", "9600"))
+RFID_DEBOUNCE_SEC = float(os.environ.get("RFID_DEBOUNCE_SEC", "3"))
+RFID_QUEUE_SIZE = int(os.environ.get("RFID_QUEUE_SIZE", "16"))
+
+UID_RE = re.compile(r"[0-9A-Fa-f]{4,32}")
 
-def save_map(d):
-    MAP_FILE.write_text(json.dumps(d, indent=2), encoding="utf-8")
+# struct input_event: timeval (two longs), u16 type, u16 code, s32 value
+EVDEV_EVENT = struct.Struct("llHHi")
+EV_KEY = 0x01
+EVDEV_KEYS = {2: "1", 3: "2", 4: "3", 5: "4", 6: "5", 7: "6", 8: "7", 9: "8", 10: "9", 11: "0",
+              30: "A", 48: "B", 46: "C", 32: "D", 18: "E", 33: "F"}
+EVDEV_ENTER = (28, 96)  # KEY_ENTER, KEY_KPENTER
+
+def open_serial(path: str, baud: int = RFID_BAUD) -> int:
+    fd = os.open(path, os.O_RDONLY | os.O_NOCTTY)
+    try:
+        attrs = termios.tcgetattr(fd)
+        speed = getattr(termios, f"B{baud}", termios.B9600)
+        # raw 8N1, canonical input so read() returns whole lines
+        attrs[0] = termios.IGNPAR | termios.ICRNL                   # iflag
+        attrs[1] = 0                                                 # oflag
+        attrs[2] = termios.CS8 | termios.CREAD | termios.CLOCAL     # cflag
+        attrs[3] = termios.ICANON                                    # lflag
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    except termios.error:
+        pass  # a pipe or pty without full termios support still works
+    return fd
+
+def read_serial_uids(fd: int):
+    buf = b""
+    while True:
+        chunk = os.read(fd, 64)
+        if not chunk:
+            return
+        buf += chunk
+        *lines, buf = re.split(rb"[\r\n]+", buf)
+        for line in lines:
+            m = UID_RE.search(line.decode("ascii", "ignore"))
+            if m:
+                yield m.group(0).upper()
+
+def read_evdev_uids(fd: int):
+    typed = []
+    while True:
+        data = os.read(fd, EVDEV_EVENT.size * 16)
+        if not data:
+            return
+        for off in range(0, len(data) - EVDEV_EVENT.size + 1, EVDEV_EVENT.size):
+            _, _, etype, code, value = EVDEV_EVENT.unpack_from(data, off)
+            if etype != EV_KEY or value != 1:  # key-down only
+                continue
+            if code in EVDEV_ENTER:
+                if typed:
+                    yield "".join(typed)
+                typed = []
+            elif code in EVDEV_KEYS:
+                typed.append(EVDEV_KEYS[code])
+
+class TapDebouncer:
+    def __init__(self, window: float = RFID_DEBOUNCE_SEC):
+        self.window = window
+        self._last: Dict[str, float] = {}
+
+    def accept(self, uid: str, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        last = self._last.get(uid)
+        # every read refreshes the window, so a resting card stays suppressed
+        self._last[uid] = now
+        if len(self._last) > 256:
+            self._last = {u: t for u, t in self._last.items() if now - t < self.window}
+        return last is None or now - last >= self.window
+
+class RFIDReaderService:
+    def __init__(self, device: str, debounce: float = RFID_DEBOUNCE_SEC, queue_size: int = RFID_QUEUE_SIZE):
+        self.device = device
+        self.debouncer = TapDebouncer(debounce)
+        self.taps: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self.stats = {"reads": 0, "taps": 0, "debounced": 0, "dropped": 0}
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, uid: str):
+        self.stats["reads"] += 1
+        if not self.debouncer.accept(uid):
+            self.stats["debounced"] += 1
+            return
+        try:
+            self.taps.put_nowait(uid)
+        except queue.Full:
+            # playback is behind; the newest tap is the one that matters
+            try:
+                self.taps.get_nowait()
+                self.stats["dropped"] += 1
+            except queue.Empty:
+                pass
+            self.taps.put_nowait(uid)
+        self.stats["taps"] += 1
+
+    def _read_loop(self):
+        while not self._stop.is_set():
+            try:
+                if "/input/" in self.device:
+                    fd = os.open(self.device, os.O_RDONLY)
+                    uids = read_evdev_uids(fd)
+                else:
+                    fd = open_serial(self.device)
+                    uids = read_serial_uids(fd)
+                try:
+                    for uid in uids:
+                        self.submit(uid)
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                log_news_error(f"RFID reader {self.device} error: {e}")
+            self._stop.wait(2)  # device unplugged or closed; retry
+
+    def _play_loop(self):
+        while not self._stop.is_set():
+            try:
+                uid = self.taps.get(timeout=1)
+            except queue.Empty:
+                continue
+            fname = video_map_index.lookup(uid)
+            path = safe_join(str(VIDEO_DIR), fname) if fname else None
+            if not path or not os.path.isfile(path):
+                log_news_error(f"RFID tap {uid}: no video mapped")
+                continue
+            playback.play(Path(path))  # failures are logged and shown in /api/playback
+
+    def start(self):
+        for target, name in ((self._read_loop, "rfid-reader"), (self._play_loop, "rfid-playback")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, stop: threading.Event):
+        self.start()
+        stop.wait()
+        self.stop()
+
+class FakeReader:
+    """pty-backed stand-in for a serial reader: point RFIDReaderService at
+    `.device` and call `.tap("A1B2C3D4")` to simulate a card read."""
+
+    def __init__(self):
+        self._master, slave = os.openpty()
+        self.device = os.ttyname(slave)
+        self._slave = slave  # held open so the pty stays alive
+
+    def tap(self, uid: str):
+        os.write(self._master, uid.encode("ascii") + b"\r\n")
+
+    def close(self):
+        os.close(self._master)
+        os.close(self._slave)
+
+rfid_reader = RFIDReaderService(RFID_READER) if RFID_READER and ADMIN_ROLE != "worker" else None
+if rfid_reader:
+    services.add("rfid-reader", rfid_reader.run)
 
 # === Rotation helpers ===
-def get_rotation_index() -> int:
-    if STATE_FILE.exists():
+# Headline cursors live in memory, one per kiosk. next() on an itertools.count
+# is atomic under the GIL, so concurrent /idle requests never lose an
+# increment and never touch the disk; a timer thread persists the positions.
+# Threads may record their index out of order, so the persisted position only
+# ever moves forward (max under a small lock).
+ROTATION_FLUSH_SEC = float(os.environ.get("ROTATION_FLUSH_SEC", "10"))
+ROTATION_MAX_KIOSKS = 64
+
+class RotationCounter:
+    def __init__(self, path: Path):
+        self.path = path
+        self._start: Dict[str, int] = {}
+        self._cursors: Dict[str, itertools.count] = {}
+        self._issued: Dict[str, int] = {}
+        self._flushed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
         try:
-            return int(json.loads(STATE_FILE.read_text(encoding="utf-8")).get("index", 0))
-        except:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._start = {k: int(v) for k, v in (data.get("kiosks") or {}).items()}
+            self._start.setdefault("default", int(data.get("index", 0)))
+        except Exception as e:
+            log_news_error(f"Failed to read state file: {e}")
+
+    def next(self, kiosk: str = "default") -> int:
+        cursor = self._cursors.get(kiosk)
+        if cursor is None:
+            if len(self._cursors) >= ROTATION_MAX_KIOSKS and kiosk != "default":
+                return self.next("default")
+            cursor = self._cursors.setdefault(kiosk, itertools.count(self._start.get(kiosk, self._start.get("default", 0))))
+        idx = next(cursor)
+        with self._lock:
+            if idx + 1 > self._issued.get(kiosk, 0):
+                self._issued[kiosk] = idx + 1
+        return idx
+
+    def positions(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._start, **self._issued}
+
+    def flush(self):
+        positions = self.positions()
+        if positions == self._flushed:
+            return
+        data = {"index": positions.get("default", 0), "kiosks": positions}
+        durable_writer.write(self.path, json.dumps(data))
+        self._flushed = positions
+
+rotation = RotationCounter(STATE_FILE)
+
+def rotation_flush_loop(stop: threading.Event, interval_sec: float = ROTATION_FLUSH_SEC):
+    while not stop.wait(interval_sec):
+        rotation.flush()
+    rotation.flush()
+
+if ADMIN_ROLE != "worker":
+    # workers never hand out cursors (/idle is forwarded), so a flush there
+    # would only write back stale startup positions
+    services.add("rotation-flush", rotation_flush_loop)
+
+def kiosk_id() -> str:
+    return (request.args.get("kiosk") or request.remote_addr or "default")[:64]
+
+# === Chunked uploads ===
+# Resumable upload protocol for large videos:
+#   POST   /api/uploads              {"filename", "size", "sha256"?} -> {"id", "offset"}
+#   GET    /api/uploads/<id>         -> {"offset"}  (where to resume)
+#   PUT    /api/uploads/<id>         raw chunk, Upload-Offset header, optional X-Chunk-SHA256
+#   POST   /api/uploads/<id>/complete  verify size/sha256, fsync, rename into VIDEO_DIR
+#   DELETE /api/uploads/<id>         abort
+# Chunks are streamed from the socket straight into UPLOAD_DIR/<id>.part in
+# UPLOAD_BUFFER pieces, so memory stays flat whatever the file size. A chunk
+# that fails (disconnect, bad checksum) is truncated away so the part file and
+# the running sha256 always agree with the reported offset.
+UPLOAD_TTL = float(os.environ.get("UPLOAD_TTL_HOURS", "24")) * 3600
+
+class UploadError(Exception):
+    def __init__(self, status: int, message: str, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+class UploadSession:
+    def __init__(self, upload_id: str, filename: str, size: int, sha256: str = "", created: float = None):
+        self.id = upload_id
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256.lower()
+        self.created = created or time.time()
+        self.lock = threading.Lock()
+        self._hasher = None
+
+    @property
+    def part(self) -> Path:
+        return UPLOAD_DIR / f"{self.id}.part"
+
+    @property
+    def meta(self) -> Path:
+        return UPLOAD_DIR / f"{self.id}.json"
+
+    @property
+    def offset(self) -> int:
+        try:
+            return self.part.stat().st_size
+        except FileNotFoundError:
             return 0
-    return 0
 
-def set_rotation_index(idx: int):
-    try:
-        STATE_FILE.write_text(json.dumps({"index": int(idx)}), encoding="utf-8")
-    except Exception as e:
-        log_news_error(f"Failed to write state file: {e}")
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "filename": self.filename, "size": self.size, "offset": self.offset}
 
-def increment_rotation_index(total: int):
-    if total <= 0:
-        set_rotation_index(0)
-        return
-    idx = (get_rotation_index() + 1) % total
-    set_rotation_index(idx)
+    def hasher(self):
+        # Rebuilt from the part file after a restart; kept incrementally otherwise
+        if self._hasher is None:
+            h = hashlib.sha256()
+            with open(self.part, "rb") as f:
+                for block in iter(lambda: f.read(UPLOAD_BUFFER), b""):
+                    h.update(block)
+            self._hasher = h
+        return self._hasher
+
+    def write_chunk(self, stream, offset: int, chunk_sha256: str = ""):
+        with self.lock:
+            if offset != self.offset:
+                raise UploadError(409, "offset mismatch", offset=self.offset)
+            running = self.hasher().copy()
+            chunk_hash = hashlib.sha256()
+            written = 0
+            with open(self.part, "r+b") as f:
+                f.seek(offset)
+                try:
+                    for block in iter(lambda: stream.read(UPLOAD_BUFFER), b""):
+                        written += len(block)
+                        if offset + written > self.size:
+                            raise UploadError(413, "chunk runs past declared size")
+                        f.write(block)
+                        running.update(block)
+                        chunk_hash.update(block)
+                    if chunk_sha256 and chunk_hash.hexdigest() != chunk_sha256.lower():
+                        raise UploadError(422, "chunk checksum mismatch")
+                except BaseException:
+                    f.truncate(offset)
+                    raise
+            self._hasher = running
+            return self.offset
+
+    def commit(self) -> Path:
+        with self.lock:
+            if self.offset != self.size:
+                raise UploadError(409, "upload incomplete", offset=self.offset)
+            digest = self.hasher().hexdigest()
+            if self.sha256 and digest != self.sha256:
+                raise UploadError(422, "file checksum mismatch", sha256=digest)
+            with open(self.part, "rb+") as f:
+                os.fsync(f.fileno())
+            dest = video_store.ingest_file(self.part, self.filename, digest)
+            self.meta.unlink(missing_ok=True)
+            self.sha256 = digest
+            return dest
+
+    def abort(self):
+        self.part.unlink(missing_ok=True)
+        self.meta.unlink(missing_ok=True)
+
+class UploadManager:
+    def __init__(self):
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+
+    def create(self, filename: str, size: int, sha256: str = "") -> UploadSession:
+        filename = secure_filename(filename)
+        if not filename or size < 0:
+            raise UploadError(400, "filename and size are required")
+        self.prune()
+        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        sess = UploadSession(secrets.token_hex(16), filename, size, sha256)
+        sess.part.touch()
+        atomic_write_text(sess.meta, json.dumps({"filename": filename, "size": size, "sha256": sess.sha256, "created": sess.created}))
+        with self._lock:
+            self._sessions[sess.id] = sess
+        return sess
+
+    def get(self, upload_id: str) -> UploadSession:
+        with self._lock:
+            sess = self._sessions.get(upload_id)
+            if sess is None and re.fullmatch(r"[0-9a-f]{32}", upload_id):
+                meta = UPLOAD_DIR / f"{upload_id}.json"
+                if meta.exists():  # resume across a restart
+                    m = json.loads(meta.read_text(encoding="utf-8"))
+                    sess = self._sessions[upload_id] = UploadSession(upload_id, m["filename"], m["size"], m.get("sha256", ""), m.get("created"))
+        if sess is None:
+            raise UploadError(404, "unknown upload")
+        return sess
+
+    def finish(self, sess: UploadSession):
+        with self._lock:
+            self._sessions.pop(sess.id, None)
+
+    def prune(self):
+        # Expire by last activity: the .json is written once at creation, the
+        # .part on every chunk. A session with a chunk in flight is left alone.
+        if not UPLOAD_DIR.exists():
+            return
+        cutoff = time.time() - UPLOAD_TTL
+        for meta in UPLOAD_DIR.glob("*.json"):
+            part = meta.with_suffix(".part")
+            try:
+                last = max(meta.stat().st_mtime, part.stat().st_mtime if part.exists() else 0)
+            except FileNotFoundError:
+                continue  # committed or aborted meanwhile
+            if last >= cutoff:
+                continue
+            with self._lock:
+                sess = self._sessions.get(meta.stem)
+            if sess is not None and not sess.lock.acquire(blocking=False):
+                continue
+            try:
+                meta.unlink(missing_ok=True)
+                part.unlink(missing_ok=True)
+                with self._lock:
+                    self._sessions.pop(meta.stem, None)
+            finally:
+                if sess is not None:
+                    sess.lock.release()
+
+uploads = UploadManager()
 
 # === Flask routes ===
 @app.route("/")
 def index():
     video_map = load_map()
-    files = sorted([f.name for f in VIDEO_DIR.iterdir() if f.is_file()])
-    return render_template("index.html", video_map=video_map, files=files)
+    files = video_store.names()
+    meta = {name: media_index.get(name) or {} for name in files}
+    return render_template("index.html", video_map=video_map, files=files, meta=meta)
 
 @app.route("/upload", methods=["POST"])
 def upload():
     f = request.files.get("file")
-    if f and f.filename:
-        f.save(str(VIDEO_DIR / f.filename))
+    name = secure_filename(f.filename) if f and f.filename else ""
+    if name:
+        transcoder.enqueue(video_store.ingest_stream(f.stream, name))
     return redirect(url_for("index"))
 
+@app.errorhandler(UploadError)
+def upload_error(e: UploadError):
+    return jsonify({"ok": False, "error": str(e), **e.extra}), e.status
+
+@app.route("/api/uploads", methods=["POST"])
+def api_upload_create():
+    body = request.get_json(silent=True)
+    if body is None:
+        body = request.form
+    elif not isinstance(body, dict):
+        raise UploadError(400, "request body must be a JSON object")
+    try:
+        size = int(body.get("size", -1))
+    except (TypeError, ValueError):
+        size = -1
+    sess = uploads.create(str(body.get("filename") or ""), size, str(body.get("sha256") or ""))
+    return jsonify({"ok": True, "chunk_size": 8 * UPLOAD_BUFFER, **sess.to_dict()}), 201
+
+@app.route("/api/uploads/<upload_id>", methods=["GET"])
+def api_upload_status(upload_id):
+    return jsonify({"ok": True, **uploads.get(upload_id).to_dict()})
+
+@app.route("/api/uploads/<upload_id>", methods=["PUT"])
+def api_upload_chunk(upload_id):
+    sess = uploads.get(upload_id)
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        raise UploadError(400, "Upload-Offset header required", offset=sess.offset)
+    new_offset = sess.write_chunk(request.stream, offset, request.headers.get("X-Chunk-SHA256", ""))
+    return jsonify({"ok": True, "offset": new_offset})
+
+@app.route("/api/uploads/<upload_id>/complete", methods=["POST"])
+def api_upload_complete(upload_id):
+    sess = uploads.get(upload_id)
+    dest = sess.commit()
+    uploads.finish(sess)
+    transcoder.enqueue(dest)
+    return jsonify({"ok": True, "file": dest.name, "sha256": sess.sha256})
+
+@app.route("/api/uploads/<upload_id>", methods=["DELETE"])
+def api_upload_abort(upload_id):
+    sess = uploads.get(upload_id)
+    sess.abort()
+    uploads.finish(sess)
+    return jsonify({"ok": True})
+
 @app.route("/map", methods=["POST"])
 def map_uid():
     uid = request.form.get("uid", "").strip().upper()
     fname = request.form.get("file", "").strip()
     if uid and fname:
-        vm = load_map(); vm[uid] = fname; save_map(vm)
+        video_map_index.set(uid, fname)
     return redirect(url_for("index"))
 
 @app.route("/delete/<uid>")
 def delete(uid):
-    vm = load_map()
-    if uid in vm:
-        del vm[uid]; save_map(vm)
+    video_map_index.delete(uid)
     return redirect(url_for("index"))
 
 @app.route("/api/news")
 def api_news():
-    if NEWS_CACHE.exists():
-        try:
-            data = json.loads(NEWS_CACHE.read_text(encoding="utf-8"))
-            return jsonify(data)
-        except Exception as e:
-            log_news_error(f"API news error: {e}")
+    snap = current_news_snapshot()
+    if snap is not None:
+        return news_snapshot_response(snap)
     return jsonify({"generated": 0, "items": [{"title": "No news available", "description": "", "link": "", "source": "System", "published": ""}]})
 
 @app.route("/idle")
 def idle():
     try:
-        news = json.loads(NEWS_CACHE.read_text(encoding="utf-8")) if NEWS_CACHE.exists() else {"items": [{"title": "Waiting for tech news...", "description": "", "link": "", "source": "System", "published": ""}]}
-        items = news.get("items") or [{"title": "Waiting for tech news...", "description": "", "link": "", "source": "System", "published": ""}]
-        total = len(items)
-        idx = get_rotation_index()
-        headline = items[idx % total]
-        news_out = {"generated": news.get("generated", 0), "items": [headline]}
-        increment_rotation_index(total)
+        snap = current_news_snapshot()
+        items = (snap and snap.items) or [Article("Waiting for tech news...", "", "", "System", "")]
+        headline = items[rotation.next(kiosk_id()) % len(items)]
+        news_out = {"generated": snap.generated if snap else 0, "items": [headline.to_dict()]}
     except Exception as e:
         log_news_error(f"Idle load error: {e}")
         news_out = {"generated": 0, "items": [{"title": "Error loading headlines", "description": "", "link": "", "source": "System", "published": ""}]}
-    return render_template("idle.html", news=news_out, rotate_ms=30000)
+    company_video = video_url(COMPANY_VIDEO) if COMPANY_VIDEO and (VIDEO_DIR / COMPANY_VIDEO).is_file() else ""
+    duration = (media_index.get(COMPANY_VIDEO) or {}).get("duration") if company_video else None
+    return render_template("idle.html", news=news_out, rotate_ms=30000, company_video=company_video,
+                           company_video_ms=int(duration * 1000) if duration else 30000)
+
+# Videos are served with Range/If-Range/ETag handling by Werkzeug; waitress
+# streams them through its file_wrapper in chunks (it has no sendfile). Behind
+# a reverse proxy the proxy can send the bytes instead:
+#   VIDEO_OFFLOAD=x-sendfile  Apache mod_xsendfile, lighttpd (USE_X_SENDFILE=1 also works)
+#   VIDEO_OFFLOAD=x-accel     nginx; VIDEO_ACCEL_PREFIX must be an `internal`
+#                             location aliased to BASE_DIR
+# /videos/h/<sha256>/<name> never changes content, so it is cached for a year
+# as immutable; plain /videos/<name> must be revalidated but usually gets 304.
+VIDEO_MAX_AGE = 365 * 24 * 3600
+VIDEO_OFFLOAD = os.environ.get("VIDEO_OFFLOAD", "x-sendfile" if os.environ.get("USE_X_SENDFILE") == "1" else "").lower()
+VIDEO_ACCEL_PREFIX = "/" + os.environ.get("VIDEO_ACCEL_PREFIX", "/_media/").strip("/") + "/"
+app.config["USE_X_SENDFILE"] = VIDEO_OFFLOAD == "x-sendfile"
+
+def accel_redirect(resp: Response, path: Path) -> Response:
+    # Hand the body to nginx; it does Range itself on the internal redirect.
+    # 304s and errors are already complete and go out as they are.
+    if VIDEO_OFFLOAD != "x-accel" or resp.status_code not in (200, 206):
+        return resp
+    resp.close()
+    out = Response(status=200, content_type=resp.content_type)
+    for name in ("ETag", "Last-Modified", "Cache-Control"):
+        if name in resp.headers:
+            out.headers[name] = resp.headers[name]
+    out.headers["X-Accel-Redirect"] = VIDEO_ACCEL_PREFIX + quote(Path(path).resolve().relative_to(BASE_DIR.resolve()).as_posix())
+    return out
+COMPANY_VIDEO = os.environ.get("COMPANY_VIDEO", "").strip()  # file in VIDEO_DIR shown on /idle
+
+@app.template_global()
+def video_url(name: str) -> str:
+    digest = video_store.digest(name)
+    if digest:
+        return url_for("server_video_hashed", digest=digest, filename=name)
+    return url_for("server_video", filename=name)
 
 @app.route("/videos/<path:filename>")
 def server_video(filename):
-    return send_from_directory(VIDEO_DIR, filename)
+    resp = send_from_directory(VIDEO_DIR, filename, etag=video_store.digest(filename) or True, max_age=0)
+    resp.cache_control.no_cache = True
+    return accel_redirect(resp, safe_join(str(VIDEO_DIR), filename))
+
+@app.route("/posters/<name>")
+def server_poster(name):
+    resp = send_from_directory(POSTER_DIR, name, max_age=VIDEO_MAX_AGE)  # named by content hash
+    resp.cache_control.immutable = True
+    return accel_redirect(resp, safe_join(str(POSTER_DIR), name))
+
+@app.route("/api/videos/meta")
+def api_videos_meta():
+    return jsonify({name: media_index.get(name) or {} for name in video_store.names()})
+
+@app.route("/videos/h/<digest>/<path:filename>")
+def server_video_hashed(digest, filename):
+    if not re.fullmatch(r"[0-9a-f]{64}", digest):
+        abort(404)
+    blob = video_store.blob_path(digest)
+    if not blob.is_file():
+        abort(404)
+    resp = send_file(blob, mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+                     etag=digest, max_age=VIDEO_MAX_AGE)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return accel_redirect(resp, blob)
+
+@app.route("/api/tap", methods=["POST"])
+@app.route("/api/tap/<uid>", methods=["POST"])
+def api_tap(uid=None):
+    uid = (uid or request.values.get("uid", "")).strip().upper()
+    fname = video_map_index.lookup(uid) if uid else None
+    path = safe_join(str(VIDEO_DIR), fname) if fname else None
+    if not path or not os.path.isfile(path):
+        return jsonify({"ok": False, "uid": uid, "error": "no video mapped to this card"}), 404
+    sup = playback_outputs.get(request.values.get("output", ""), playback)
+    if not sup.play(Path(path)):
+        return jsonify({"ok": False, "uid": uid, "file": fname, "output": sup.output, "error": sup.error}), 503
+    return jsonify({"ok": True, "uid": uid, "file": fname, "output": sup.output})
+
+@app.route("/api/videos")
+def api_videos():
+    refs = video_store.refcounts()
+    return jsonify({name: {"sha256": digest, "refs": refs.get(digest, 0)} for name, digest in video_store.aliases.items()})
+
+@app.route("/api/videos/<path:name>", methods=["DELETE"])
+def api_video_delete(name):
+    uids = [uid for uid, fname in load_map().items() if fname == name]
+    if uids:
+        return jsonify({"ok": False, "error": "video is still mapped to cards", "uids": uids}), 409
+    if not video_store.remove(name):
+        return jsonify({"ok": False, "error": "unknown video"}), 404
+    return jsonify({"ok": True})
+
+@app.route("/api/transcode")
+def api_transcode():
+    return jsonify(transcoder.jobs)
+
+@app.route("/api/transcode/retry", methods=["POST"])
+def api_transcode_retry():
+    # one video by name, or everything the rescan has given up on
+    name = request.values.get("name") or None
+    if name and not video_store.digest(name):
+        return jsonify({"ok": False, "error": "unknown video"}), 404
+    return jsonify({"ok": True, "queued": transcoder.retry(name)})
+
+@app.route("/api/playback")
+def api_playback():
+    return jsonify([sup.status() for sup in playback_outputs.values()])
+
+@app.route("/api/playback/stop", methods=["POST"])
+def api_playback_stop():
+    sup = playback_outputs.get(request.values.get("output", ""), playback)
+    sup.stop()
+    return jsonify(sup.status())
+
+@app.route("/api/news/providers")
+def api_news_providers():
+    return jsonify([p.status() for p in NEWS_PROVIDERS])
+
+@app.route("/api/services")
+def api_services():
+    return jsonify({"role": ADMIN_ROLE, "pid": os.getpid(), "services": services.status()})
 
 @app.route("/api/map")
 def api_map():
-    return jsonify(load_map())
+    return jsonify(dict(load_map()))
 
 # === Run server ===
+# Production entry point on waitress. A single process with a thread pool is
+# the default and is plenty for a kiosk admin box. With --workers N (behind a
+# reverse proxy) the main process keeps all state, devices and background jobs
+# and listens on 127.0.0.1:--control-port, while N worker processes share the
+# public port via SO_REUSEPORT and serve the hot read-only paths (/api/news,
+# videos, posters, static) themselves, forwarding every other request to the
+# main process.
+WORKER_ENDPOINTS = {"api_news", "server_video", "server_video_hashed", "server_poster", "static"}
+HOP_HEADERS = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+               "transfer-encoding", "upgrade", "host", "content-length"}
+SHARED_FOLLOW_SEC = 2.0
+
+def create_wsgi_app() -> Flask:
+    # Entry point for external runners, which never execute the __main__
+    # block: `waitress-serve --call admin_app:create_wsgi_app`
+    services.start()
+    return app
+
+@app.before_request
+def route_to_main_process():
+    if ADMIN_CONTROL_URL and request.endpoint not in WORKER_ENDPOINTS:
+        return proxy_to_main_process()
+
+# Own session for forwarding: no retries (a replayed GET such as /delete/<uid>
+# is not harmless), no default headers, one pooled connection per thread.
+# The worker __main__ sizes it from --threads; other entry points (e.g.
+# create_wsgi_app() with ADMIN_CONTROL_URL set) get one on first use.
+proxy_session: Optional[requests.Session] = None
+_proxy_session_lock = threading.Lock()
+
+def build_proxy_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    session.headers.clear()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    return session
+
+def get_proxy_session() -> requests.Session:
+    global proxy_session
+    if proxy_session is None:
+        with _proxy_session_lock:
+            if proxy_session is None:
+                proxy_session = build_proxy_session(int(os.environ.get("SERVER_THREADS", "8")))
+    return proxy_session
+
+def proxy_to_main_process() -> Response:
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+    # the main process trusts these from loopback, so kiosk_id() and
+    # url_for() see the real client
+    headers["X-Forwarded-For"] = request.remote_addr or ""
+    headers["X-Forwarded-Proto"] = request.scheme
+    headers["X-Forwarded-Host"] = request.host
+    body = request.stream if request.content_length or request.headers.get("Transfer-Encoding") else None
+    upstream = get_proxy_session().request(request.method, ADMIN_CONTROL_URL + request.full_path.rstrip("?"), headers=headers,
+                                     data=body, stream=True, allow_redirects=False, timeout=(HTTP_CONNECT_TIMEOUT, None))
+    resp_headers = [(k, v) for k, v in upstream.raw.headers.items() if k.lower() not in HOP_HEADERS]
+    return Response(upstream.raw.stream(UPLOAD_BUFFER, decode_content=False), status=upstream.status_code, headers=resp_headers)
+
+def follow_shared_files(stop: threading.Event):
+    # Processes that don't fetch news (workers, standby mains) or don't own
+    # the video store (workers) pick up the writer's results from disk.
+    seen = {}
+    while not stop.is_set():
+        followed = [] if news_leader.held else [(NEWS_CACHE, load_news_snapshot)]
+        if ADMIN_ROLE == "worker":
+            followed.append((ALIAS_FILE, video_store.reload))
+        for path, reload in followed:
+            try:
+                mtime = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if seen.get(path) != mtime:
+                seen[path] = mtime
+                reload()
+        stop.wait(SHARED_FOLLOW_SEC)
+
+services.add("shared-follow", follow_shared_files)
+
+def reuseport_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+def spawn_worker(args) -> subprocess.Popen:
+    env = dict(os.environ, ADMIN_ROLE="worker", ADMIN_CONTROL_URL=f"http://127.0.0.1:{args.control_port}")
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--host", args.host, "--port", str(args.port),
+           "--threads", str(args.threads), "--connection-limit", str(args.connection_limit),
+           "--backlog", str(args.backlog), "--channel-timeout", str(args.channel_timeout)]
+    if args.trusted_proxy:
+        cmd += ["--trusted-proxy", args.trusted_proxy]
+    return subprocess.Popen(cmd, env=env)
+
+def supervise_workers(args, workers: List[subprocess.Popen]):
+    while True:
+        time.sleep(1)
+        for i, proc in enumerate(workers):
+            if proc.poll() is not None:
+                log_news_error(f"HTTP worker {proc.pid} exited with {proc.returncode}, restarting")
+                workers[i] = spawn_worker(args)
+
+def parse_server_args(argv=None) -> argparse.Namespace:
+    env = os.environ.get
+    ap = argparse.ArgumentParser(description="Alliance RFID Admin server")
+    ap.add_argument("--host", default=env("SERVER_HOST", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=int(env("SERVER_PORT", "5969")))
+    ap.add_argument("--threads", type=int, default=int(env("SERVER_THREADS", "8")), help="request threads per process")
+    ap.add_argument("--connection-limit", type=int, default=int(env("SERVER_CONNECTION_LIMIT", "200")))
+    ap.add_argument("--backlog", type=int, default=int(env("SERVER_BACKLOG", "1024")))
+    ap.add_argument("--channel-timeout", type=int, default=int(env("SERVER_CHANNEL_TIMEOUT", "120")),
+                    help="seconds an idle connection is kept open")
+    ap.add_argument("--workers", type=int, default=int(env("SERVER_WORKERS", "1")),
+                    help="extra HTTP worker processes (use behind a reverse proxy)")
+    ap.add_argument("--control-port", type=int, default=int(env("SERVER_CONTROL_PORT", "0")) or None,
+                    help="loopback port of the main process in --workers mode (default: port + 1)")
+    ap.add_argument("--trusted-proxy", default=env("SERVER_TRUSTED_PROXY", ""),
+                    help="address of the reverse proxy whose X-Forwarded-* headers are trusted")
+    ap.add_argument("--dev", action="store_true", help="use the Flask development server")
+    args = ap.parse_args(argv)
+    args.control_port = args.control_port or args.port + 1
+    return args
+
+def waitress_options(args, trusted_proxy: str = "") -> Dict[str, Any]:
+    opts = {"threads": args.threads, "connection_limit": args.connection_limit, "backlog": args.backlog,
+            "channel_timeout": args.channel_timeout, "ident": "rfid-admin"}
+    trusted_proxy = trusted_proxy or args.trusted_proxy
+    if trusted_proxy:
+        opts.update(trusted_proxy=trusted_proxy, trusted_proxy_headers="x-forwarded-for x-forwarded-proto x-forwarded-host",
+                    clear_untrusted_proxy_headers=True)
+    return opts
+
 if __name__ == "__main__":
-    print(f"[INFO] Starting Alliance RFID Admin on port 5969")
+    server_args = parse_server_args()
+    if ADMIN_ROLE == "worker":
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        proxy_session = build_proxy_session(server_args.threads)
+        services.start()
+        waitress.serve(app, sockets=[reuseport_socket(server_args.host, server_args.port, server_args.backlog)],
+                       **waitress_options(server_args))
+        sys.exit(0)
+
+    print(f"[INFO] Starting Alliance RFID Admin on port {server_args.port}")
     print(f"[INFO] Video directory: {VIDEO_DIR}")
     print(f"[INFO] Templates directory: {BASE_DIR / 'templates'}")
-    app.run(host="0.0.0.0", port=5969, debug=False)
+    mapped = [VIDEO_DIR / f for f in set(load_map().values()) if (VIDEO_DIR / f).is_file()]
+    for sup in playback_outputs.values():
+        sup.engine.warm(preload=mapped)
+    # SIGTERM (systemd, docker stop) exits through atexit: services stop,
+    # counters and stores flush, HTTP workers are terminated.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    services.start()
+
+    if server_args.dev:
+        app.run(host=server_args.host, port=server_args.port, debug=False, threaded=True)
+    elif server_args.workers > 1:
+        workers = [spawn_worker(server_args) for _ in range(server_args.workers)]
+        atexit.register(lambda: [w.terminate() for w in workers])
+        threading.Thread(target=supervise_workers, args=(server_args, workers), daemon=True).start()
+        print(f"[INFO] {server_args.workers} HTTP workers on port {server_args.port}, main process on 127.0.0.1:{server_args.control_port}")
+        # only the local workers can reach this port; trust their forwarding headers
+        waitress.serve(app, host="127.0.0.1", port=server_args.control_port,
+                       **waitress_options(server_args, trusted_proxy="127.0.0.1"))
+    else:
+        waitress.serve(app, host=server_args.host, port=server_args.port, **waitress_options(server_args))